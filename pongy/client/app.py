@@ -1,36 +1,99 @@
+import asyncio
 import logging
 import uuid
 
+from pongy import settings
 from pongy.client.connection import ExitEvent
+from pongy.client.connection import ReconnectEvent
 from pongy.client.connection import WebsocketConnection
 from pongy.client.controls import KeyboardControls
+from pongy.client.interpolation import RacketPredictor
+from pongy.client.interpolation import SnapshotBuffer
 from pongy.client.ui import Ui
+from pongy.models import MoveDirection
 from pongy.models import WsErrorEvent
+from pongy.models import WsGameStateEvent
 
 logger = logging.getLogger(__name__)
 
 
 class Application:
-    def __init__(self, host: str, port: int):
-        player_id: str = str(uuid.uuid4())
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        spectate: str | None = None,
+        compression: str = settings.WS_COMPRESSION,
+    ):
+        self.player_id: str = str(uuid.uuid4())
+        self.spectate: str | None = spectate
         self.ui = Ui()
         self.controls = KeyboardControls()
+        self.snapshots = SnapshotBuffer()
+        self.predictor = RacketPredictor()
+        self.direction: MoveDirection | None = None
+        self.seq: int = 0
+        self.input_sent: float = 0.0
         self.connection = WebsocketConnection(
-            host=host, port=port, headers={"Cookie": f"player_id={player_id}"}
+            host=host,
+            port=port,
+            headers={"Cookie": f"player_id={self.player_id}"},
+            path=f"/ws/spectate/{spectate}" if spectate else "/ws",
+            compression=compression,
         )
 
     async def __call__(self) -> None:
-        async with self.connection as connection:
+        loop = asyncio.get_running_loop()
+        async with self.connection:
             while True:
-                event = await connection.get_event_blocking()
-                if self.controls.is_exit_pressed() or isinstance(event, ExitEvent):
+                started = loop.time()
+                if self.controls.is_exit_pressed() or not self._receive(started):
                     logger.debug("Exit")
                     break
-                if isinstance(event.data, WsErrorEvent):
-                    logger.error(event.data.payload.message)
-                    break
-                action = self.controls.get_action()
-                if action:
-                    await connection.send_action(action)
-                self.ui.redraw(event.data)
+                await self._send_input(self.controls.get_action(), started)
+                self.predictor.advance(started)
+                payload = self.snapshots.sample(started)
+                if payload:
+                    self.ui.redraw(self.predictor.apply(payload, self.player_id))
+                elapsed = loop.time() - started
+                await asyncio.sleep(max(0.0, 1 / settings.CLIENT_FPS - elapsed))
         self.ui.stop()
+
+    async def _send_input(self, direction: MoveDirection | None, now: float) -> None:
+        # The server holds the last input, so only changes are sent, and
+        # at most INPUT_MAX_RATE of them per second.
+        if (
+            self.spectate
+            or direction == self.direction
+            or not self.snapshots.latest
+            or now - self.input_sent < 1 / settings.INPUT_MAX_RATE
+        ):
+            return
+        # Input that didn't reach a connection is sent again once there is one.
+        if not await self.connection.send_input(direction, self.seq + 1):
+            return
+        self.direction = direction
+        self.seq += 1
+        self.input_sent = now
+        self.predictor.input(direction, self.seq)
+
+    def _receive(self, now: float) -> bool:
+        while event := self.connection.get_event_nowait():
+            if isinstance(event, ExitEvent):
+                return False
+            if isinstance(event, ReconnectEvent):
+                # The server stops a dropped player's racket, so the
+                # prediction stops too, and a held key is sent again.
+                self.direction = None
+                self.predictor.input(None, self.seq)
+                continue
+            if isinstance(event.data, WsErrorEvent):
+                logger.error(event.data.payload.message)
+                return False
+            if isinstance(event.data, WsGameStateEvent):
+                payload = event.data.payload
+                self.snapshots.push(payload, now)
+                for player in payload.players:
+                    if player.uuid == self.player_id:
+                        self.predictor.reconcile(player.racket.position, player.seq)
+        return True
@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import logging
+import random
+import statistics
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from dataclasses import field
+
+import aiohttp
+
+from pongy import settings
+from pongy.codec import CODECS
+from pongy.codec import DeltaCodec
+from pongy.codec import get_codec
+from pongy.codec import ICodec
+from pongy.compression import OFF
+from pongy.compression import send_compress
+from pongy.models import MoveDirection
+from pongy.models import WsEvent
+from pongy.models import WsGameStateEvent
+from pongy.models import WsSessionEvent
+
+logger = logging.getLogger(__name__)
+
+# Inputs not acknowledged in this many seconds count as lost.
+PROBE_TIMEOUT = 1
+
+
+@dataclass
+class BenchStats:
+    connected: int = 0
+    failed: int = 0
+    frames: int = 0
+    bytes: int = 0
+    dropped: int = 0
+    commands: int = 0
+    lost_commands: int = 0
+    latencies: list[float] = field(default_factory=list)
+    intervals: list[float] = field(default_factory=list)
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+
+
+class BenchPlayer:
+    # A headless player. It sends an input at most every 1 / rate seconds,
+    # pressing and releasing alternate directions so the racket stays off the
+    # walls, and measures the time until a received frame acknowledges it.
+    def __init__(
+        self,
+        url: str,
+        protocols: tuple[str, ...],
+        rate: float,
+        stats: BenchStats,
+        compression: str = OFF,
+    ) -> None:
+        self._url = url
+        self._protocols = protocols
+        self._compression = compression
+        self._compress = zlib.MAX_WBITS if compression != OFF else 0
+        self._rate = rate
+        self._stats = stats
+        self._uuid = str(uuid.uuid4())
+        self._inputs = itertools.cycle(
+            (MoveDirection.LEFT, None, MoveDirection.RIGHT, None)
+        )
+        self._seq = 0
+        self._probe: tuple[float, int] | None = None
+        self._acked: int | None = None
+
+    async def run(self, session: aiohttp.ClientSession, duration: float) -> None:
+        try:
+            async with session.ws_connect(
+                self._url,
+                headers={"Cookie": f"player_id={self._uuid}"},
+                protocols=self._protocols,
+                compress=self._compress,
+            ) as ws:
+                self._stats.connected += 1
+                codec = get_codec(ws.protocol)
+                sender = asyncio.create_task(self._send(ws, codec))
+                try:
+                    await asyncio.wait_for(self._receive(ws, codec), duration)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    sender.cancel()
+        except aiohttp.ClientError as err:
+            logger.debug("Bench connection failed: %s", err)
+            self._stats.failed += 1
+
+    async def _send(self, ws: aiohttp.ClientWebSocketResponse, codec: ICodec) -> None:
+        compress = send_compress(self._compression, ws.compress)
+        while True:
+            await asyncio.sleep(1 / self._rate)
+            now = time.perf_counter()
+            if self._probe and now - self._probe[0] > PROBE_TIMEOUT:
+                self._stats.lost_commands += 1
+                self._probe = None
+            if self._probe or self._acked is None:
+                continue
+            self._seq += 1
+            self._probe = now, self._seq
+            frame = codec.encode_input(next(self._inputs), self._seq)
+            if isinstance(frame, bytes):
+                await ws.send_bytes(frame, compress=compress)
+            else:
+                await ws.send_str(frame, compress=compress)
+            self._stats.commands += 1
+
+    async def _receive(
+        self, ws: aiohttp.ClientWebSocketResponse, codec: ICodec
+    ) -> None:
+        tick: int | None = None
+        received: float | None = None
+        async for message in ws:
+            if message.type not in (aiohttp.WSMsgType.BINARY, aiohttp.WSMsgType.TEXT):
+                continue
+            now = time.perf_counter()
+            self._stats.bytes += len(message.data)
+            if message.type == aiohttp.WSMsgType.BINARY:
+                event = codec.decode(message.data)
+            else:
+                event = WsEvent.parse_raw(message.data)
+            if event is None:
+                # Counted as a tick gap once the next keyframe arrives.
+                continue
+            if isinstance(event.data, WsSessionEvent):
+                continue
+            if not isinstance(event.data, WsGameStateEvent):
+                logger.warning("Unexpected bench event %s", event.data.event)
+                return
+            self._stats.frames += 1
+            # Waiting games only send changes, so their gaps don't count.
+            waiting = len(event.data.payload.players) < settings.GAME_MIN_PLAYERS
+            if received is not None and not waiting:
+                self._stats.intervals.append(now - received)
+            received = None if waiting else now
+            if isinstance(codec, DeltaCodec):
+                step = max(1, settings.TICK_RATE // settings.SNAPSHOT_RATE)
+                if tick is not None and not waiting and codec.tick > tick + step:
+                    self._stats.dropped += (codec.tick - tick) // step - 1
+                tick = None if waiting else codec.tick
+            for player in event.data.payload.players:
+                if player.uuid == self._uuid:
+                    self._acked = player.seq
+            if (
+                self._probe
+                and self._acked is not None
+                and self._acked >= self._probe[1]
+            ):
+                self._stats.latencies.append(now - self._probe[0])
+                self._probe = None
+
+
+async def run_bench(
+    host: str,
+    port: int,
+    players: int,
+    rate: float,
+    duration: float,
+    protocol: str | None = None,
+    compression: str = settings.WS_COMPRESSION,
+) -> BenchStats:
+    url = f"ws://{host}:{port}/ws"
+    protocols = (protocol,) if protocol else tuple(CODECS)
+    stats = BenchStats()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def start(player: BenchPlayer) -> None:
+            # Spread connects over a second rather than opening them at once.
+            await asyncio.sleep(random.random())
+            await player.run(session, duration)
+
+        await asyncio.gather(
+            *(
+                start(BenchPlayer(url, protocols, rate, stats, compression))
+                for _ in range(players)
+            )
+        )
+    report(stats, players, duration)
+    return stats
+
+
+def report(stats: BenchStats, players: int, duration: float) -> None:
+    expected = 1 / settings.SNAPSHOT_RATE
+    jitter = [abs(interval - expected) for interval in stats.intervals]
+    logger.info(
+        "Benchmark report",
+        extra={
+            "players": players,
+            "connected": stats.connected,
+            "failed": stats.failed,
+            "frames_per_second": round(stats.frames / duration, 1),
+            "frames_per_second_per_player": round(
+                stats.frames / duration / max(stats.connected, 1), 1
+            ),
+            "bytes_per_frame": round(stats.bytes / max(stats.frames, 1), 1),
+            "dropped_frames": stats.dropped,
+            "commands": stats.commands,
+            "lost_commands": stats.lost_commands,
+            "latency_ms": {
+                str(percent): round(percentile(stats.latencies, percent) * 1000, 2)
+                for percent in (50, 90, 99)
+            },
+            "tick_jitter_ms": {
+                "mean": round(statistics.fmean(jitter) * 1000, 2) if jitter else 0,
+                "99": round(percentile(jitter, 99) * 1000, 2),
+            },
+        },
+    )
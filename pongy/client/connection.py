@@ -1,35 +1,62 @@
 import asyncio
 import logging
+import zlib
 from contextlib import suppress
 from typing import Any
 
 import aiohttp
+from aiohttp import WSCloseCode
 
 from pongy import settings
+from pongy.codec import BINARY_PROTOCOL
+from pongy.codec import DELTA_PROTOCOL
+from pongy.codec import get_codec
+from pongy.codec import ICodec
+from pongy.codec import JSON_PROTOCOL
+from pongy.compression import OFF
+from pongy.compression import send_compress
 from pongy.models import MoveDirection
-from pongy.models import WsCommand
-from pongy.models import WsCommandMovePayload
 from pongy.models import WsEvent
+from pongy.models import WsRedirectEvent
+from pongy.models import WsSessionEvent
 
 logger = logging.getLogger(__name__)
 
+# Closes the server meant, for idling or otherwise, aren't reconnected after.
+FINAL_CLOSE_CODES = (WSCloseCode.OK, WSCloseCode.POLICY_VIOLATION)
+
 
 class ExitEvent:
     pass
 
 
+class ReconnectEvent:
+    pass
+
+
 class WebsocketConnection:
     def __init__(
         self,
         host: str = settings.SERVER_HOST,
         port: int = settings.SERVER_PORT,
         headers: dict[str, str] | None = None,
+        path: str = "/ws",
+        compression: str = settings.WS_COMPRESSION,
     ):
         self._headers: dict[str, str] = headers or {}
+        self._path: str = path
+        self._compression: str = compression
+        self._compress: int = zlib.MAX_WBITS if compression != OFF else 0
+        self._send_compress: int | None = None
         self._host: str = host
         self._port: int = port
         self._ws: aiohttp.ClientWebSocketResponse | None = None
-        self._event_queue: asyncio.Queue[WsEvent | ExitEvent] = asyncio.Queue()
+        self._codec: ICodec = get_codec(None)
+        self._event_queue: asyncio.Queue[
+            WsEvent | ExitEvent | ReconnectEvent
+        ] = asyncio.Queue()
+        self._attempts: int = 0
+        self._session_token: str | None = None
         self._background_task: asyncio.Task[Any] | None = None
 
     async def __aenter__(self) -> "WebsocketConnection":
@@ -42,33 +69,93 @@ class WebsocketConnection:
             with suppress(asyncio.CancelledError):
                 await self._background_task
 
-    async def send_action(self, direction: MoveDirection) -> None:
-        if self._ws:
-            ws_event = WsCommand(payload=WsCommandMovePayload(direction=direction))
-            await self._ws.send_json(ws_event.dict())
+    async def send_input(self, direction: MoveDirection | None, seq: int) -> bool:
+        if self._ws is None or self._ws.closed:
+            return False
+        frame = self._codec.encode_input(direction, seq)
+        if isinstance(frame, bytes):
+            await self._ws.send_bytes(frame, compress=self._send_compress)
+        else:
+            await self._ws.send_str(frame, compress=self._send_compress)
+        return True
 
-    async def get_event_blocking(self) -> ExitEvent | WsEvent:
+    async def get_event_blocking(self) -> ExitEvent | ReconnectEvent | WsEvent:
         return await self._event_queue.get()
 
+    def get_event_nowait(self) -> ExitEvent | ReconnectEvent | WsEvent | None:
+        try:
+            return self._event_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
     async def _keep_connection(self) -> None:
-        url = f"ws://{self._host}:{self._port}/ws"
+        # A dropped connection is retried with backoff, and the server gives
+        # the player back their slot if they make it in time.
         try:
             async with aiohttp.ClientSession() as session:
-                async with session.ws_connect(
-                    url,
-                    heartbeat=settings.WS_HEARTBEAT_TIMEOUT,
-                    headers=self._headers,
-                ) as ws:
-                    self._ws = ws
-                    async for msg in ws:
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            ws_event = WsEvent.parse_raw(msg.data)
-                            self._event_queue.put_nowait(ws_event)
-        except aiohttp.ClientConnectionError:
-            logger.error("Connection error")
+                while self._attempts < settings.RECONNECT_ATTEMPTS:
+                    try:
+                        if await self._connect(session):
+                            logger.debug("Redirected to %s:%s", self._host, self._port)
+                            continue
+                        if self._ws and self._ws.close_code in FINAL_CLOSE_CODES:
+                            logger.error("Disconnected by server")
+                            break
+                        logger.warning("Connection lost")
+                    except aiohttp.ClientConnectionError:
+                        logger.warning("Connection error")
+                    self._ws = None
+                    await asyncio.sleep(
+                        min(
+                            settings.RECONNECT_DELAY * 2**self._attempts,
+                            settings.RECONNECT_MAX_DELAY,
+                        )
+                    )
+                    self._attempts += 1
+                else:
+                    logger.error("Gave up reconnecting")
         except Exception as err:  # pylint: disable=broad-except
             logger.exception(err)
-        else:
-            logger.error("Connection lost")
         finally:
             self._event_queue.put_nowait(ExitEvent())
+
+    def _session_headers(self) -> dict[str, str]:
+        # The token of the seat this client had, to get it back.
+        if self._session_token is None:
+            return self._headers
+        cookie = f"session_token={self._session_token}"
+        if "Cookie" in self._headers:
+            cookie = f"{self._headers['Cookie']}; {cookie}"
+        return {**self._headers, "Cookie": cookie}
+
+    async def _connect(self, session: aiohttp.ClientSession) -> bool:
+        url = f"ws://{self._host}:{self._port}{self._path}"
+        async with session.ws_connect(
+            url,
+            heartbeat=settings.WS_HEARTBEAT_TIMEOUT,
+            headers=self._session_headers(),
+            protocols=(DELTA_PROTOCOL, BINARY_PROTOCOL, JSON_PROTOCOL),
+            compress=self._compress,
+        ) as ws:
+            self._ws = ws
+            self._codec = get_codec(ws.protocol)
+            self._send_compress = send_compress(self._compression, ws.compress)
+            if self._attempts:
+                self._event_queue.put_nowait(ReconnectEvent())
+            self._attempts = 0
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.BINARY:
+                    ws_event = self._codec.decode(msg.data)
+                    if ws_event:
+                        self._event_queue.put_nowait(ws_event)
+                elif msg.type == aiohttp.WSMsgType.TEXT:
+                    ws_event = WsEvent.parse_raw(msg.data)
+                    if isinstance(ws_event.data, WsSessionEvent):
+                        self._session_token = ws_event.data.payload.token
+                        continue
+                    if isinstance(ws_event.data, WsRedirectEvent):
+                        self._host = ws_event.data.payload.host
+                        self._port = ws_event.data.payload.port
+                        return True
+                    self._event_queue.put_nowait(ws_event)
+        return False
@@ -0,0 +1,137 @@
+from collections import deque
+from typing import NamedTuple
+
+from pongy import settings
+from pongy.models import MoveDirection
+from pongy.models import WsBall
+from pongy.models import WsGameStatePayload
+from pongy.models import WsPlayer
+from pongy.models import WsRacket
+
+
+class Snapshot(NamedTuple):
+    time: float
+    payload: WsGameStatePayload
+
+
+def lerp(start: int, end: int, ratio: float) -> int:
+    return round(start + (end - start) * ratio)
+
+
+class SnapshotBuffer:
+    # Renders the world a fixed delay in the past, so there are usually two
+    # snapshots around the render time to interpolate between and network
+    # jitter doesn't show up as stutter.
+    def __init__(
+        self, delay: float = settings.INTERPOLATION_DELAY, size: int = 32
+    ) -> None:
+        self._delay = delay
+        self._snapshots: deque[Snapshot] = deque(maxlen=size)
+
+    def push(self, payload: WsGameStatePayload, now: float) -> None:
+        self._snapshots.append(Snapshot(now, payload))
+
+    @property
+    def latest(self) -> WsGameStatePayload | None:
+        return self._snapshots[-1].payload if self._snapshots else None
+
+    def sample(self, now: float) -> WsGameStatePayload | None:
+        if not self._snapshots:
+            return None
+        target = now - self._delay
+        while len(self._snapshots) > 2 and self._snapshots[1].time <= target:
+            self._snapshots.popleft()
+        start = self._snapshots[0]
+        if len(self._snapshots) == 1 or target <= start.time:
+            return start.payload
+        end = self._snapshots[1]
+        ratio = min(1.0, (target - start.time) / (end.time - start.time))
+        return self._interpolate(start.payload, end.payload, ratio)
+
+    @staticmethod
+    def _interpolate(
+        start: WsGameStatePayload, end: WsGameStatePayload, ratio: float
+    ) -> WsGameStatePayload:
+        positions = {player.uuid: player.racket.position for player in start.players}
+        players = [
+            WsPlayer.construct(
+                uuid=player.uuid,
+                score=player.score,
+                racket=WsRacket.construct(
+                    position=lerp(
+                        positions.get(player.uuid, player.racket.position),
+                        player.racket.position,
+                        ratio,
+                    ),
+                    side=player.racket.side,
+                ),
+            )
+            for player in end.players
+        ]
+        ball = WsBall.construct(
+            position=(
+                lerp(start.ball.position[0], end.ball.position[0], ratio),
+                lerp(start.ball.position[1], end.ball.position[1], ratio),
+            )
+        )
+        return WsGameStatePayload.construct(players=players, ball=ball)
+
+
+class RacketPredictor:
+    # Moves the local racket with the sent input right away, at the speed the
+    # server moves it. Once the server has acknowledged the latest input and
+    # the racket is released, the authoritative position is taken as is,
+    # while held it is only corrected if the prediction drifted too far.
+    def __init__(self, max_lag: float = settings.PREDICTION_MAX_LAG) -> None:
+        self._tolerance = settings.RACKET_SPEED * max_lag
+        self._position: float | None = None
+        self._direction: MoveDirection | None = None
+        self._seq = 0
+        self._updated = 0.0
+
+    def input(self, direction: MoveDirection | None, seq: int) -> None:
+        self._direction = direction
+        self._seq = seq
+
+    def advance(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self._position is None or self._direction is None:
+            return
+        distance = settings.RACKET_SPEED * elapsed
+        if self._direction == MoveDirection.LEFT:
+            distance = -distance
+        self._position = max(
+            0.0,
+            min(
+                float(settings.BOARD_SIZE - settings.RACKET_LENGTH),
+                self._position + distance,
+            ),
+        )
+
+    def reconcile(self, position: int, seq: int) -> None:
+        if (
+            self._position is None
+            or (seq >= self._seq and self._direction is None)
+            or abs(self._position - position) > self._tolerance
+        ):
+            self._position = position
+
+    def predict(self) -> int | None:
+        return None if self._position is None else round(self._position)
+
+    def apply(self, payload: WsGameStatePayload, uuid: str) -> WsGameStatePayload:
+        position = self.predict()
+        if position is None:
+            return payload
+        players = [
+            WsPlayer.construct(
+                uuid=player.uuid,
+                score=player.score,
+                racket=WsRacket.construct(position=position, side=player.racket.side),
+            )
+            if player.uuid == uuid
+            else player
+            for player in payload.players
+        ]
+        return WsGameStatePayload.construct(players=players, ball=payload.ball)
@@ -3,9 +3,12 @@ import pygame
 from pongy import settings
 from pongy import version
 from pongy.client.widgets.ball import BallWidget
+from pongy.client.widgets.racket import IRacketWidget
 from pongy.client.widgets.racket import RacketWidgetFactory
+from pongy.client.widgets.score import IScoreWidget
 from pongy.client.widgets.score import ScoreWidgetFactory
-from pongy.models import WsGameStateEvent
+from pongy.models import BoardSide
+from pongy.models import WsGameStatePayload
 
 
 class Ui:
@@ -16,21 +19,65 @@ class Ui:
             (settings.BOARD_SIZE, settings.BOARD_SIZE)
         )
         self._surface.fill(settings.BOARD_COLOR)
+        pygame.display.flip()
+        self._rackets: dict[BoardSide, IRacketWidget] = {}
+        self._scores: dict[BoardSide, IScoreWidget] = {}
+        self._ball: BallWidget | None = None
 
     @staticmethod
     def stop() -> None:
         pygame.quit()
 
-    def redraw(self, ws_event: WsGameStateEvent) -> None:
-        self._surface.fill(settings.BOARD_COLOR)
-        for player in ws_event.payload.players:
-            racket_widget = RacketWidgetFactory(player.racket.side).create(
-                player.racket.position
-            )
-            score_widget = ScoreWidgetFactory(player.racket.side).create(player.score)
-            racket_widget.draw(self._surface)
-            score_widget.draw(self._surface)
-
-        ball_widget = BallWidget(ws_event.payload.ball.position)
-        ball_widget.draw(self._surface)
-        pygame.display.flip()
+    def redraw(self, payload: WsGameStatePayload) -> None:
+        # Widgets are kept between frames, only areas they left or moved to
+        # are repainted and pushed to the display.
+        dirty: list[pygame.Rect] = []
+        sides = set()
+        for player in payload.players:
+            side = player.racket.side
+            sides.add(side)
+            racket = self._rackets.get(side)
+            if racket is None:
+                racket = self._rackets[side] = RacketWidgetFactory(side).create(
+                    player.racket.position
+                )
+                dirty.append(racket.rect)
+            elif racket.position != player.racket.position:
+                dirty.append(racket.rect)
+                racket.position = player.racket.position
+                dirty.append(racket.rect)
+            score = self._scores.get(side)
+            if score is None:
+                score = self._scores[side] = ScoreWidgetFactory(side).create(
+                    player.score
+                )
+                dirty.append(score.rect)
+            elif score.score != player.score:
+                dirty.append(score.rect)
+                score.score = player.score
+                dirty.append(score.rect)
+        for side in set(self._rackets) - sides:
+            dirty.append(self._rackets.pop(side).rect)
+            dirty.append(self._scores.pop(side).rect)
+        if self._ball is None:
+            self._ball = BallWidget(payload.ball.position)
+            dirty.append(self._ball.rect)
+        elif self._ball.position != payload.ball.position:
+            dirty.append(self._ball.rect)
+            self._ball.position = payload.ball.position
+            dirty.append(self._ball.rect)
+        if not settings.DIRTY_RECT_RENDERING:
+            dirty = [self._surface.get_rect()]
+        if not dirty:
+            return
+        for rect in dirty:
+            self._surface.fill(settings.BOARD_COLOR, rect)
+        widgets: list[IScoreWidget | IRacketWidget | BallWidget] = [
+            *self._scores.values(),
+            *self._rackets.values(),
+            self._ball,
+        ]
+        for widget in widgets:
+            if widget.rect.collidelist(dirty) != -1:
+                widget.draw(self._surface)
+        pygame.display.update(dirty)
@@ -1,3 +1,6 @@
+from abc import ABC
+from abc import abstractmethod
+from typing import Callable
 from typing import Protocol
 
 import pygame
@@ -7,17 +10,28 @@ from pongy.models import BoardSide
 
 
 class IRacketWidget(Protocol):
+    position: int
+
+    @property
+    def rect(self) -> pygame.Rect:
+        pass
+
     def draw(self, surface: pygame.surface.Surface) -> None:
         pass
 
 
-class BaseRacketWidget:
+class BaseRacketWidget(ABC):
     def __init__(self, position: int):
-        self._position = position
+        self.position = position
 
-    def draw(self, surface: pygame.surface.Surface) -> None:
+    @property
+    @abstractmethod
+    def rect(self) -> pygame.Rect:
         pass
 
+    def draw(self, surface: pygame.surface.Surface) -> None:
+        pygame.draw.rect(surface, settings.RACKET_COLOR, self.rect)
+
 
 class HorizontalRacketWidget(BaseRacketWidget):
     def __init__(self, position: int):
@@ -34,58 +48,46 @@ class VerticalRacketWidget(BaseRacketWidget):
 
 
 class TopRacketWidget(HorizontalRacketWidget):
-    def draw(self, surface: pygame.surface.Surface) -> None:
-        pygame.draw.rect(
-            surface,
-            settings.RACKET_COLOR,
-            pygame.Rect(
-                self._position,
-                0,
-                self._width,
-                self._height,
-            ),
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(
+            self.position,
+            0,
+            self._width,
+            self._height,
         )
 
 
 class LeftRacketWidget(VerticalRacketWidget):
-    def draw(self, surface: pygame.surface.Surface) -> None:
-        pygame.draw.rect(
-            surface,
-            settings.RACKET_COLOR,
-            pygame.Rect(
-                0,
-                self._position,
-                self._width,
-                self._height,
-            ),
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(
+            0,
+            self.position,
+            self._width,
+            self._height,
         )
 
 
 class RightRacketWidget(VerticalRacketWidget):
-    def draw(self, surface: pygame.surface.Surface) -> None:
-        pygame.draw.rect(
-            surface,
-            settings.RACKET_COLOR,
-            pygame.Rect(
-                settings.BOARD_SIZE - settings.RACKET_HEIGHT,
-                self._position,
-                self._width,
-                self._height,
-            ),
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(
+            settings.BOARD_SIZE - settings.RACKET_HEIGHT,
+            self.position,
+            self._width,
+            self._height,
         )
 
 
 class BottomRacketWidget(HorizontalRacketWidget):
-    def draw(self, surface: pygame.surface.Surface) -> None:
-        pygame.draw.rect(
-            surface,
-            settings.RACKET_COLOR,
-            pygame.Rect(
-                self._position,
-                settings.BOARD_SIZE - settings.RACKET_HEIGHT,
-                self._width,
-                self._height,
-            ),
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(
+            self.position,
+            settings.BOARD_SIZE - settings.RACKET_HEIGHT,
+            self._width,
+            self._height,
         )
 
 
@@ -94,7 +96,7 @@ class RacketWidgetFactory:
         self.side = side
 
     def create(self, position: int) -> IRacketWidget:
-        mapping = {
+        mapping: dict[BoardSide, Callable[[int], IRacketWidget]] = {
             BoardSide.RIGHT: RightRacketWidget,
             BoardSide.LEFT: LeftRacketWidget,
             BoardSide.TOP: TopRacketWidget,
@@ -7,21 +7,48 @@ from pongy.models import BoardSide
 
 
 class IScoreWidget(Protocol):
+    score: int
+
+    @property
+    def rect(self) -> pygame.Rect:
+        pass
+
     def draw(self, surface: pygame.surface.Surface) -> None:
         pass
 
 
 class BaseScoreWidget:
     position = (0, 0)
+    _font: pygame.font.Font | None = None
 
     def __init__(self, score: int):
-        self._score = str(score)
+        self._score = score
+        self._text = self._render()
+
+    @property
+    def score(self) -> int:
+        return self._score
+
+    @score.setter
+    def score(self, value: int) -> None:
+        if value != self._score:
+            self._score = value
+            self._text = self._render()
+
+    @property
+    def rect(self) -> pygame.Rect:
+        return self._text.get_rect(center=self.position)
 
     def draw(self, surface: pygame.surface.Surface) -> None:
-        font = pygame.font.Font(None, settings.SCORE_FONT_SIZE)
-        text = font.render(self._score, True, settings.SCORE_FONT_COLOR)
-        text_rect = text.get_rect(center=self.position)
-        surface.blit(text, text_rect)
+        surface.blit(self._text, self.rect)
+
+    def _render(self) -> pygame.surface.Surface:
+        if BaseScoreWidget._font is None:
+            BaseScoreWidget._font = pygame.font.Font(None, settings.SCORE_FONT_SIZE)
+        # Opaque text can be blitted over itself when a dirty area is redrawn.
+        return BaseScoreWidget._font.render(
+            str(self._score), True, settings.SCORE_FONT_COLOR, settings.BOARD_COLOR
+        )
 
 
 class BottomScoreWidget(BaseScoreWidget):
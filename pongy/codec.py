@@ -0,0 +1,404 @@
+import json
+import struct
+from typing import NamedTuple
+from typing import Protocol
+
+from pongy import settings
+from pongy.models import MoveDirection
+from pongy.models import WsBall
+from pongy.models import WsCommand
+from pongy.models import WsCommandInputPayload
+from pongy.models import WsEvent
+from pongy.models import WsGameStateEvent
+from pongy.models import WsGameStatePayload
+from pongy.models import WsMoveCommand
+from pongy.models import WsPlayer
+from pongy.models import WsRacket
+
+JSON_PROTOCOL = "pongy.json"
+
+BINARY_PROTOCOL = "pongy.bin"
+
+DELTA_PROTOCOL = "pongy.delta"
+
+BINARY_VERSION = 2
+
+STATE_FRAME = 1
+
+KEY_FRAME = 2
+
+DELTA_FRAME = 3
+
+INPUT_FRAME = 4
+
+
+class CodecError(Exception):
+    pass
+
+
+class PlayerState(NamedTuple):
+    uuid: str
+    score: int
+    side: int
+    position: int
+    seq: int = 0
+
+
+class GameState(NamedTuple):
+    ball: tuple[int, int]
+    players: tuple[PlayerState, ...]
+    tick: int = 0
+
+
+def is_unchanged(sent: GameState | None, state: GameState) -> bool:
+    # Whatever the tick.
+    return (
+        sent is not None and sent.ball == state.ball and sent.players == state.players
+    )
+
+
+class ICodec(Protocol):
+    protocol: str
+
+    def baseline(self, state: GameState, sent: GameState | None) -> GameState | None:
+        pass
+
+    def encode(self, state: GameState, base: GameState | None = None) -> str | bytes:
+        pass
+
+    def decode(self, data: str | bytes) -> WsEvent | None:
+        pass
+
+    def encode_input(self, direction: MoveDirection | None, seq: int) -> str | bytes:
+        pass
+
+    def decode_input(self, data: str | bytes) -> tuple[MoveDirection | None, int]:
+        pass
+
+    def is_input(self, data: str | bytes) -> bool:
+        pass
+
+
+def to_event(state: GameState) -> WsEvent:
+    # Server generated state is trusted, so models are built without validation.
+    return WsEvent.construct(
+        data=WsGameStateEvent.construct(
+            event="game_state",
+            payload=WsGameStatePayload.construct(
+                players=[
+                    WsPlayer.construct(
+                        uuid=player.uuid,
+                        score=player.score,
+                        racket=WsRacket.construct(
+                            position=player.position, side=player.side
+                        ),
+                        seq=player.seq,
+                    )
+                    for player in state.players
+                ],
+                ball=WsBall.construct(position=state.ball),
+            ),
+        )
+    )
+
+
+class JsonCodec:
+    __slots__ = ()
+    protocol = JSON_PROTOCOL
+
+    def baseline(self, state: GameState, sent: GameState | None) -> GameState | None:
+        return None
+
+    def encode(self, state: GameState, base: GameState | None = None) -> str:
+        return json.dumps(
+            {
+                "data": {
+                    "event": "game_state",
+                    "payload": {
+                        "players": [
+                            {
+                                "uuid": player.uuid,
+                                "score": player.score,
+                                "racket": {
+                                    "position": player.position,
+                                    "side": player.side,
+                                },
+                                "seq": player.seq,
+                            }
+                            for player in state.players
+                        ],
+                        "ball": {"position": list(state.ball)},
+                    },
+                }
+            }
+        )
+
+    def decode(self, data: str | bytes) -> WsEvent:
+        return WsEvent.parse_raw(data)
+
+    def encode_input(self, direction: MoveDirection | None, seq: int) -> str:
+        return WsCommand(
+            payload=WsCommandInputPayload(direction=direction, seq=seq)
+        ).json()
+
+    def decode_input(self, data: str | bytes) -> tuple[MoveDirection | None, int]:
+        command = WsCommand.parse_raw(data)
+        direction = command.payload.direction
+        return MoveDirection(direction) if direction else None, command.payload.seq
+
+    def is_input(self, data: str | bytes) -> bool:
+        return isinstance(data, str) and data.startswith("{")
+
+
+def decode_move(data: str | bytes) -> MoveDirection | None:
+    # The direction of an old client's move command, None for other input.
+    if not isinstance(data, str) or '"move"' not in data:
+        return None
+    return MoveDirection(WsMoveCommand.parse_raw(data).payload.direction)
+
+
+# Frame layout, network byte order:
+# header - version u8, frame type u8, ball x i16, ball y i16, players count u8
+# player - side u8, position i16, score u32, last input seq u32,
+#          uuid length u16, uuid utf-8 bytes
+# input  - version u8, frame type u8, direction u8 (0 when released), seq u32
+class BinaryCodec:
+    __slots__ = ()
+    protocol = BINARY_PROTOCOL
+    _header = struct.Struct("!BBhhB")
+    _player = struct.Struct("!BhIIH")
+    _input = struct.Struct("!BBBI")
+
+    def baseline(self, state: GameState, sent: GameState | None) -> GameState | None:
+        return None
+
+    def encode(self, state: GameState, base: GameState | None = None) -> bytes:
+        parts = [
+            self._header.pack(
+                BINARY_VERSION,
+                STATE_FRAME,
+                state.ball[0],
+                state.ball[1],
+                len(state.players),
+            )
+        ]
+        self._pack_players(state.players, parts)
+        return b"".join(parts)
+
+    def decode(self, data: str | bytes) -> WsEvent | None:
+        if not isinstance(data, bytes):
+            raise CodecError("Binary frame expected")
+        try:
+            version, frame_type, ball_x, ball_y, count = self._header.unpack_from(data)
+            if version != BINARY_VERSION or frame_type != STATE_FRAME:
+                raise CodecError(f"Unsupported frame {version}:{frame_type}")
+            players = self._unpack_players(data, self._header.size, count)
+        except (struct.error, UnicodeDecodeError) as err:
+            raise CodecError("Malformed binary frame") from err
+        return to_event(GameState(ball=(ball_x, ball_y), players=players))
+
+    def encode_input(self, direction: MoveDirection | None, seq: int) -> bytes:
+        return self._input.pack(BINARY_VERSION, INPUT_FRAME, direction or 0, seq)
+
+    def decode_input(self, data: str | bytes) -> tuple[MoveDirection | None, int]:
+        if not isinstance(data, bytes) or len(data) != self._input.size:
+            raise CodecError("Malformed input frame")
+        version, frame_type, direction, seq = self._input.unpack(data)
+        if version != BINARY_VERSION or frame_type != INPUT_FRAME:
+            raise CodecError(f"Unsupported frame {version}:{frame_type}")
+        if direction not in (0, *MoveDirection):
+            raise CodecError("Malformed input frame")
+        return MoveDirection(direction) if direction else None, seq
+
+    def is_input(self, data: str | bytes) -> bool:
+        return (
+            isinstance(data, bytes)
+            and len(data) == self._input.size
+            and data[1] == INPUT_FRAME
+        )
+
+    def _pack_players(
+        self, players: tuple[PlayerState, ...], parts: list[bytes]
+    ) -> None:
+        for player in players:
+            uuid = player.uuid.encode()
+            parts.append(
+                self._player.pack(
+                    player.side, player.position, player.score, player.seq, len(uuid)
+                )
+            )
+            parts.append(uuid)
+
+    def _unpack_players(
+        self, data: bytes, offset: int, count: int
+    ) -> tuple[PlayerState, ...]:
+        players = []
+        for _ in range(count):
+            side, position, score, seq, size = self._player.unpack_from(data, offset)
+            offset += self._player.size
+            end = offset + size
+            uuid = data[offset:end].decode()
+            offset = end
+            players.append(PlayerState(uuid, score, side, position, seq))
+        if offset != len(data):
+            raise CodecError("Malformed binary frame")
+        return tuple(players)
+
+
+# Keyframes carry the full state, delta frames only what changed since the
+# state the connection was last sent (TCP delivers frames in order, so that
+# state is what the client holds). A delta whose base tick does not match the
+# client's last tick is skipped until the next keyframe.
+# key frame   - version u8, frame type u8, tick u32, ball x i16, ball y i16,
+#               players count u8, then players as in BinaryCodec
+# delta frame - version u8, frame type u8, tick u32, base tick u32,
+#               ball changed u8, [ball x i16, ball y i16], changes count u8,
+#               then per change: player index u8, fields mask u8,
+#               [position i16], [score u32], [last input seq u32]
+class DeltaCodec(BinaryCodec):
+    __slots__ = ("_state",)
+    protocol = DELTA_PROTOCOL
+    _key = struct.Struct("!BBIhhB")
+    _delta = struct.Struct("!BBIIB")
+    _ball = struct.Struct("!hh")
+    _change = struct.Struct("!BB")
+    _position = struct.Struct("!h")
+    _score = struct.Struct("!I")
+    _seq = struct.Struct("!I")
+    _position_changed = 1
+    _score_changed = 2
+    _seq_changed = 4
+
+    def __init__(self) -> None:
+        self._state: GameState | None = None
+
+    @property
+    def tick(self) -> int:
+        return self._state.tick if self._state else 0
+
+    def baseline(self, state: GameState, sent: GameState | None) -> GameState | None:
+        if sent is None:
+            return None
+        # Only every few ticks are sent, so look for a crossed boundary.
+        if (
+            state.tick // settings.KEYFRAME_INTERVAL
+            != sent.tick // settings.KEYFRAME_INTERVAL
+        ):
+            return None
+        if len(sent.players) != len(state.players):
+            return None
+        for old, new in zip(sent.players, state.players):
+            if old.uuid != new.uuid or old.side != new.side:
+                return None
+        return sent
+
+    def encode(self, state: GameState, base: GameState | None = None) -> bytes:
+        if base is None:
+            parts = [
+                self._key.pack(
+                    BINARY_VERSION,
+                    KEY_FRAME,
+                    state.tick,
+                    state.ball[0],
+                    state.ball[1],
+                    len(state.players),
+                )
+            ]
+            self._pack_players(state.players, parts)
+            return b"".join(parts)
+        ball_changed = state.ball != base.ball
+        parts = [
+            self._delta.pack(
+                BINARY_VERSION, DELTA_FRAME, state.tick, base.tick, ball_changed
+            )
+        ]
+        if ball_changed:
+            parts.append(self._ball.pack(*state.ball))
+        changes = []
+        count = 0
+        for index, (old, new) in enumerate(zip(base.players, state.players)):
+            mask = 0
+            if old.position != new.position:
+                mask |= self._position_changed
+            if old.score != new.score:
+                mask |= self._score_changed
+            if old.seq != new.seq:
+                mask |= self._seq_changed
+            if mask:
+                count += 1
+                changes.append(self._change.pack(index, mask))
+                if mask & self._position_changed:
+                    changes.append(self._position.pack(new.position))
+                if mask & self._score_changed:
+                    changes.append(self._score.pack(new.score))
+                if mask & self._seq_changed:
+                    changes.append(self._seq.pack(new.seq))
+        parts.append(bytes((count,)))
+        parts.extend(changes)
+        return b"".join(parts)
+
+    def decode(self, data: str | bytes) -> WsEvent | None:
+        if not isinstance(data, bytes):
+            raise CodecError("Binary frame expected")
+        try:
+            state = self._apply(data)
+        except (struct.error, UnicodeDecodeError, IndexError) as err:
+            raise CodecError("Malformed delta frame") from err
+        if state is None:
+            return None
+        self._state = state
+        return to_event(state)
+
+    def _apply(self, data: bytes) -> GameState | None:
+        version, frame_type = data[0], data[1]
+        if version != BINARY_VERSION:
+            raise CodecError(f"Unsupported frame version {version}")
+        if frame_type == KEY_FRAME:
+            _, _, tick, ball_x, ball_y, count = self._key.unpack_from(data)
+            players = self._unpack_players(data, self._key.size, count)
+            return GameState(ball=(ball_x, ball_y), players=players, tick=tick)
+        if frame_type != DELTA_FRAME:
+            raise CodecError(f"Unsupported frame type {frame_type}")
+        _, _, tick, base_tick, ball_changed = self._delta.unpack_from(data)
+        if self._state is None or self._state.tick != base_tick:
+            return None
+        offset = self._delta.size
+        ball = self._state.ball
+        if ball_changed:
+            ball_x, ball_y = self._ball.unpack_from(data, offset)
+            ball = ball_x, ball_y
+            offset += self._ball.size
+        updated = list(self._state.players)
+        count = data[offset]
+        offset += 1
+        for _ in range(count):
+            index, mask = self._change.unpack_from(data, offset)
+            offset += self._change.size
+            player = updated[index]
+            if mask & self._position_changed:
+                (position,) = self._position.unpack_from(data, offset)
+                offset += self._position.size
+                player = player._replace(position=position)
+            if mask & self._score_changed:
+                (score,) = self._score.unpack_from(data, offset)
+                offset += self._score.size
+                player = player._replace(score=score)
+            if mask & self._seq_changed:
+                (seq,) = self._seq.unpack_from(data, offset)
+                offset += self._seq.size
+                player = player._replace(seq=seq)
+            updated[index] = player
+        if offset != len(data):
+            raise CodecError("Malformed delta frame")
+        return GameState(ball=ball, players=tuple(updated), tick=tick)
+
+
+CODECS: dict[str, type[ICodec]] = {
+    DELTA_PROTOCOL: DeltaCodec,
+    BINARY_PROTOCOL: BinaryCodec,
+    JSON_PROTOCOL: JsonCodec,
+}
+
+
+def get_codec(protocol: str | None) -> ICodec:
+    return CODECS.get(protocol or JSON_PROTOCOL, JsonCodec)()
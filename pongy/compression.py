@@ -0,0 +1,122 @@
+import logging
+import random
+import time
+import zlib
+
+from pongy import settings
+from pongy.codec import CODECS
+from pongy.codec import GameState
+from pongy.codec import get_codec
+from pongy.models import MoveDirection
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+
+MESSAGE = "message"
+
+CONTEXT = "context"
+
+MODES = (OFF, MESSAGE, CONTEXT)
+
+# What aiohttp's permessage-deflate writer uses: raw deflate at the fastest
+# level, sync flushed, with the flush's empty block trailer stripped.
+_LEVEL = zlib.Z_BEST_SPEED
+
+_TRAILER = b"\x00\x00\xff\xff"
+
+# zlib's own estimate of a deflate stream's memory at the default memLevel,
+# held per connection while the context is kept.
+CONTEXT_BYTES = (1 << (zlib.MAX_WBITS + 2)) + (1 << (zlib.DEF_MEM_LEVEL + 9))
+
+
+def send_compress(mode: str, negotiated: int) -> int | None:
+    # The compress to send frames with on a connection. aiohttp keeps one
+    # context across frames, a per-send compress is the window bits of a
+    # fresh context for that frame alone, and is only allowed once deflate
+    # is negotiated. aiohttp annotates it as a bool on the server.
+    return zlib.MAX_WBITS if mode == MESSAGE and negotiated else None
+
+
+def frame_header_size(length: int) -> int:
+    # Server frames are not masked.
+    if length < 126:
+        return 2
+    if length < 1 << 16:
+        return 4
+    return 10
+
+
+class Deflater:
+    def __init__(self, mode: str) -> None:
+        self._mode = mode
+        self._context = zlib.compressobj(_LEVEL, wbits=-zlib.MAX_WBITS)
+
+    def deflate(self, payload: bytes) -> bytes:
+        if self._mode == OFF:
+            return payload
+        if self._mode == MESSAGE:
+            self._context = zlib.compressobj(_LEVEL, wbits=-zlib.MAX_WBITS)
+        data = self._context.compress(payload) + self._context.flush(zlib.Z_SYNC_FLUSH)
+        return data[: -len(_TRAILER)] if data.endswith(_TRAILER) else data
+
+
+def record_frames(ticks: int, seed: int | None, engine: str) -> dict[str, list[bytes]]:
+    # The frames one player of a seeded game is sent, per protocol. Players
+    # change their held input at about the client's input rate.
+    # pylint: disable=import-outside-toplevel
+    from pongy.server.simulation import Simulation
+
+    simulation = Simulation(engine)
+    game = simulation.add_game(seed)
+    rng = random.Random(seed)
+    codecs = {protocol: get_codec(protocol) for protocol in CODECS}
+    sent: dict[str, GameState | None] = dict.fromkeys(codecs)
+    frames: dict[str, list[bytes]] = {protocol: [] for protocol in codecs}
+    every = max(1, settings.TICK_RATE // settings.SNAPSHOT_RATE)
+    seqs = [0] * len(game.players)
+    for tick in range(ticks):
+        for index, player in enumerate(game.players):
+            if rng.random() < settings.INPUT_MAX_RATE / settings.TICK_RATE / 4:
+                seqs[index] += 1
+                direction = rng.choice((None, MoveDirection.LEFT, MoveDirection.RIGHT))
+                game.apply_input(player, direction, seqs[index])
+        simulation.run(1)
+        if tick % every:
+            continue
+        state = game.to_state()
+        for protocol, codec in codecs.items():
+            frame = codec.encode(state, codec.baseline(state, sent[protocol]))
+            frames[protocol].append(frame.encode() if isinstance(frame, str) else frame)
+            sent[protocol] = state
+    return frames
+
+
+def run_compression_bench(
+    ticks: int, seed: int | None = None, engine: str = settings.PHYSICS_ENGINE
+) -> dict[str, dict[str, dict[str, float]]]:
+    frames = record_frames(ticks, seed, engine)
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    for protocol, payloads in frames.items():
+        results[protocol] = {}
+        uncompressed = 0
+        for mode in MODES:
+            deflater = Deflater(mode)
+            size = 0
+            started = time.process_time()
+            for payload in payloads:
+                data = deflater.deflate(payload)
+                size += frame_header_size(len(data)) + len(data)
+            cpu = time.process_time() - started
+            uncompressed = uncompressed or size
+            results[protocol][mode] = {
+                "bytes_per_frame": round(size / len(payloads), 1),
+                "ratio": round(size / uncompressed, 3),
+                "cpu_us_per_frame": round(cpu / len(payloads) * 1e6, 2),
+                "context_bytes": CONTEXT_BYTES if mode == CONTEXT else 0,
+            }
+    logger.info(
+        "Compression report",
+        extra={"frames": len(frames[next(iter(frames))]), "protocols": results},
+    )
+    return results
@@ -2,6 +2,7 @@ from enum import IntEnum
 from typing import Literal
 
 from pydantic import BaseModel
+from pydantic import Field
 
 
 class MoveDirection(IntEnum):
@@ -25,6 +26,27 @@ class WsErrorEvent(BaseModel):
     payload: WsErrorEventPayload
 
 
+class WsRedirectEventPayload(BaseModel):
+    host: str
+    port: int
+
+
+class WsRedirectEvent(BaseModel):
+    event: Literal["redirect"] = "redirect"
+    payload: WsRedirectEventPayload
+
+
+# Sent to a player alone when they take a seat. Only a connection that
+# presents the token can resume the seat, as player ids are public.
+class WsSessionEventPayload(BaseModel):
+    token: str
+
+
+class WsSessionEvent(BaseModel):
+    event: Literal["session"] = "session"
+    payload: WsSessionEventPayload
+
+
 class WsRacket(BaseModel):
     position: int
     side: BoardSide
@@ -34,6 +56,7 @@ class WsPlayer(BaseModel):
     uuid: str
     score: int
     racket: WsRacket
+    seq: int = 0
 
     class Config:
         use_enum_values = True
@@ -54,7 +77,21 @@ class WsGameStateEvent(BaseModel):
 
 
 class WsEvent(BaseModel):
-    data: WsGameStateEvent | WsErrorEvent
+    data: WsGameStateEvent | WsErrorEvent | WsRedirectEvent | WsSessionEvent
+
+
+class WsCommandInputPayload(BaseModel):
+    direction: MoveDirection | None
+    # Packed as u32 by the binary codecs and replays.
+    seq: int = Field(..., ge=0, lt=2**32)
+
+    class Config:
+        use_enum_values = True
+
+
+class WsCommand(BaseModel):
+    command: Literal["input"] = "input"
+    payload: WsCommandInputPayload
 
 
 class WsCommandMovePayload(BaseModel):
@@ -64,10 +101,12 @@ class WsCommandMovePayload(BaseModel):
         use_enum_values = True
 
 
-class WsCommand(BaseModel):
+# What clients from before held input send, one per frame they receive.
+class WsMoveCommand(BaseModel):
     command: Literal["move"] = "move"
     payload: WsCommandMovePayload
 
 
 class WsCookie(BaseModel):
     player_id: str
+    session_token: str | None = None
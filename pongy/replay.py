@@ -0,0 +1,264 @@
+import bisect
+import json
+import logging
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+from typing import Iterator
+from typing import NamedTuple
+
+from pongy import settings
+from pongy.codec import GameState
+from pongy.codec import PlayerState
+from pongy.models import MoveDirection
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PONGYRPL"
+
+REPLAY_VERSION = 2
+
+KEY_RECORD = 1
+
+STATE_RECORD = 2
+
+INPUT_RECORD = 3
+
+INDEX_SUFFIX = ".idx"
+
+# File layout, network byte order:
+# header - magic, version u8
+# record - tick u32, record type u8, body length u16, body
+# key    - players count u8, then per player: side u8, uuid length u16, uuid
+# state  - ball x i16, ball y i16, players count u8,
+#          then per player: side u8, position i16, score u32, last input seq u32
+# input  - side u8, direction u8 (0 when released), seq u32
+# Key records carry the player uuids. They are written whenever players
+# change and every REPLAY_INDEX_INTERVAL ticks, and the index file next to
+# the replay lists their ticks and offsets, so playback can start at any of
+# them. An input record's tick is the last tick stepped before it was applied.
+_header = struct.Struct(f"!{len(MAGIC)}sB")
+_record = struct.Struct("!IBH")
+_key_player = struct.Struct("!BH")
+_state = struct.Struct("!hhB")
+_state_player = struct.Struct("!BhII")
+_input = struct.Struct("!BBI")
+_index = struct.Struct("!IQ")
+
+# One writer thread for all recorders keeps each file's writes in order.
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replay")
+
+
+class ReplayError(Exception):
+    pass
+
+
+def wait_replays() -> None:
+    _writer.shutdown(wait=True)
+
+
+class InputRecord(NamedTuple):
+    tick: int
+    uuid: str
+    direction: MoveDirection | None
+    seq: int
+
+
+class ReplayRecorder:
+    # Records are packed into memory on the tick path, and written to disk
+    # by the writer thread once the buffer fills up.
+    def __init__(
+        self,
+        path: str,
+        buffer_size: int = settings.REPLAY_BUFFER_SIZE,
+        index_interval: int = settings.REPLAY_INDEX_INTERVAL,
+    ) -> None:
+        self._buffer_size = buffer_size
+        self._index_interval = index_interval
+        self._file: BinaryIO = open(path, "ab")  # pylint: disable=consider-using-with
+        self._index_file: BinaryIO = open(  # pylint: disable=consider-using-with
+            path + INDEX_SUFFIX, "ab"
+        )
+        self._offset = self._file.tell()
+        self._buffer = bytearray()
+        self._index = bytearray()
+        self._players: dict[int, str] = {}
+        self._key_tick = -1
+        if self._offset == 0:
+            self._append(_header.pack(MAGIC, REPLAY_VERSION))
+
+    def record(self, state: GameState) -> None:
+        players = {player.side: player.uuid for player in state.players}
+        if (
+            players != self._players
+            or state.tick - self._key_tick >= self._index_interval
+        ):
+            self._record_key(state.tick, players)
+        body = [_state.pack(state.ball[0], state.ball[1], len(state.players))]
+        for player in state.players:
+            body.append(
+                _state_player.pack(
+                    player.side, player.position, player.score, player.seq
+                )
+            )
+        self._append_record(state.tick, STATE_RECORD, b"".join(body))
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def record_input(
+        self, tick: int, side: int, direction: MoveDirection | None, seq: int
+    ) -> None:
+        self._append_record(tick, INPUT_RECORD, _input.pack(side, direction or 0, seq))
+
+    def flush(self) -> None:
+        if self._buffer:
+            _writer.submit(self._write, self._buffer, self._index)
+            self._buffer = bytearray()
+            self._index = bytearray()
+
+    def close(self) -> None:
+        self.flush()
+        _writer.submit(self._close)
+
+    def _record_key(self, tick: int, players: dict[int, str]) -> None:
+        self._index += _index.pack(tick, self._offset)
+        body = [bytes((len(players),))]
+        for side, uuid in players.items():
+            encoded = uuid.encode()
+            body.append(_key_player.pack(side, len(encoded)))
+            body.append(encoded)
+        self._append_record(tick, KEY_RECORD, b"".join(body))
+        self._players = players
+        self._key_tick = tick
+
+    def _append_record(self, tick: int, kind: int, body: bytes) -> None:
+        self._append(_record.pack(tick, kind, len(body)))
+        self._append(body)
+
+    def _append(self, data: bytes) -> None:
+        self._buffer += data
+        self._offset += len(data)
+
+    def _write(self, data: bytearray, index: bytearray) -> None:
+        try:
+            self._file.write(data)
+            self._file.flush()
+            self._index_file.write(index)
+            self._index_file.flush()
+        except OSError as err:
+            logger.exception(err)
+
+    def _close(self) -> None:
+        self._file.close()
+        self._index_file.close()
+
+
+class ReplayReader:
+    # Memory-maps a replay, so seeking only touches the pages it reads.
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            try:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as err:
+                raise ReplayError("Empty replay") from err
+        magic, version = _header.unpack_from(self._data)
+        if magic != MAGIC or version != REPLAY_VERSION:
+            self._data.close()
+            raise ReplayError(f"Unsupported replay {magic!r}:{version}")
+        self._ticks: list[int] = []
+        self._offsets: list[int] = []
+        try:
+            with open(path + INDEX_SUFFIX, "rb") as file:
+                for tick, offset in _index.iter_unpack(file.read()):
+                    self._ticks.append(tick)
+                    self._offsets.append(offset)
+        except FileNotFoundError:
+            logger.warning("Replay index missing, reading from start")
+
+    def __enter__(self) -> "ReplayReader":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def events(
+        self, start: int = 0, stop: int | None = None
+    ) -> Iterator[GameState | InputRecord]:
+        # The index may lag behind the replay, a partly written last record
+        # ends the playback.
+        position = bisect.bisect_right(self._ticks, start) - 1
+        offset = self._offsets[position] if position >= 0 else _header.size
+        players: dict[int, str] = {}
+        while offset + _record.size <= len(self._data):
+            tick, kind, length = _record.unpack_from(self._data, offset)
+            offset += _record.size
+            if offset + length > len(self._data):
+                break
+            if stop is not None and tick > stop:
+                break
+            if kind == KEY_RECORD:
+                players = self._read_key(offset)
+            elif tick >= start and kind == STATE_RECORD:
+                yield self._read_state(tick, offset, players)
+            elif tick >= start and kind == INPUT_RECORD:
+                side, direction, seq = _input.unpack_from(self._data, offset)
+                yield InputRecord(
+                    tick,
+                    players.get(side, ""),
+                    MoveDirection(direction) if direction else None,
+                    seq,
+                )
+            offset += length
+
+    def _read_key(self, offset: int) -> dict[int, str]:
+        players = {}
+        count = self._data[offset]
+        offset += 1
+        for _ in range(count):
+            side, size = _key_player.unpack_from(self._data, offset)
+            offset += _key_player.size
+            end = offset + size
+            players[side] = self._data[offset:end].decode()
+            offset = end
+        return players
+
+    def _read_state(self, tick: int, offset: int, players: dict[int, str]) -> GameState:
+        ball_x, ball_y, count = _state.unpack_from(self._data, offset)
+        offset += _state.size
+        states = []
+        for _ in range(count):
+            side, position, score, seq = _state_player.unpack_from(self._data, offset)
+            offset += _state_player.size
+            states.append(
+                PlayerState(players.get(side, ""), score, side, position, seq)
+            )
+        return GameState(ball=(ball_x, ball_y), players=tuple(states), tick=tick)
+
+
+def print_replay(path: str, start: int = 0, stop: int | None = None) -> None:
+    with ReplayReader(path) as reader:
+        for event in reader.events(start, stop):
+            if isinstance(event, InputRecord):
+                line = json.dumps(
+                    {
+                        "tick": event.tick,
+                        "input": {
+                            "uuid": event.uuid,
+                            "direction": event.direction,
+                            "seq": event.seq,
+                        },
+                    }
+                )
+            else:
+                line = json.dumps(
+                    {
+                        "tick": event.tick,
+                        "ball": event.ball,
+                        "players": [player._asdict() for player in event.players],
+                    }
+                )
+            print(line)
@@ -1,37 +1,96 @@
-import json
+import asyncio
 import logging
+import time
 import weakref
+from contextlib import suppress
+from typing import AsyncIterator
 
 from aiohttp import web
 from aiohttp import WSCloseCode
 from aiohttp import WSMsgType
 from pydantic.error_wrappers import ValidationError
 
-from pongy.models import WsCommand
+from pongy import settings
+from pongy.codec import CodecError
+from pongy.codec import CODECS
+from pongy.codec import decode_move
+from pongy.codec import get_codec
+from pongy.compression import OFF
 from pongy.models import WsCookie
 from pongy.models import WsErrorEvent
 from pongy.models import WsErrorEventPayload
 from pongy.models import WsEvent
+from pongy.models import WsRedirectEvent
+from pongy.models import WsRedirectEventPayload
+from pongy.models import WsSessionEvent
+from pongy.models import WsSessionEventPayload
+from pongy.server.engine import get_engine
 from pongy.server.game import DuplicatedIdError
+from pongy.server.game import Game
 from pongy.server.game import GamePool
+from pongy.server.game import UnknownGameError
+from pongy.server.matchmaking import BrokerMatchmaker
+from pongy.server.matchmaking import IMatchmaker
+from pongy.server.matchmaking import MemoryMatchmaker
+from pongy.server.memory import memory_report
+from pongy.server.metrics import COMMANDS
+from pongy.server.metrics import DROPPED_COMMANDS
+from pongy.server.metrics import GAMES
+from pongy.server.metrics import REAPED
+from pongy.server.metrics import registry
+from pongy.server.metrics import SEND_BACKLOG
+from pongy.server.player import IPlayer
 from pongy.server.player import Player
+from pongy.server.reaper import Reaper
+from pongy.server.scheduler import scheduler
+from pongy.server.sender import FrameSender
 
 logger = logging.getLogger(__name__)
 
 
 class WebsocketHandler(web.View):
     async def get(self) -> web.WebSocketResponse:
-        ws = web.WebSocketResponse()
+        ws = web.WebSocketResponse(
+            protocols=tuple(CODECS),
+            heartbeat=settings.WS_HEARTBEAT_TIMEOUT,
+            compress=self.request.app["compression"] != OFF,
+        )
         await ws.prepare(self.request)
         self.request.app["websockets"].add(ws)
+        if self.request.transport:
+            self.request.app["transports"].add(self.request.transport)
         try:
             cookie = WsCookie(**self.request.cookies)
-            player = Player(uuid=cookie.player_id, ws=ws)
-            async with GamePool(player):
-                async for message in ws:
-                    if message.type == WSMsgType.TEXT:
-                        command = WsCommand(**json.loads(message.data))
-                        player.racket.move(command.payload.direction)
+            player = Player(
+                uuid=cookie.player_id, ws=ws, codec=get_codec(ws.ws_protocol)
+            )
+            matchmaker: IMatchmaker = self.request.app["matchmaker"]
+            node: str = self.request.app["node"]
+            assignment = await matchmaker.assign(player.uuid, node)
+            if assignment.node != node:
+                await self.send_redirect(assignment.node, ws)
+                return ws
+            pool = GamePool(
+                player,
+                assignment.game_id,
+                matchmaker.release,
+                token=cookie.session_token,
+            )
+            try:
+                async with pool as game:
+                    if ws.ws_protocol:
+                        # Clients from before subprotocols know no session events.
+                        await self.send_session(pool.token, ws)
+                    async for message in ws:
+                        if message.type in (WSMsgType.TEXT, WSMsgType.BINARY):
+                            self.apply_command(game, player, message.data)
+                    if pool.close_reason:
+                        code, reason = pool.close_reason
+                        await ws.close(code=code, message=reason)
+            finally:
+                player.close()
+                if isinstance(ws.exception(), asyncio.TimeoutError):
+                    REAPED.inc(reason="heartbeat")
         except Exception as err:  # pylint: disable=broad-except
             await self.send_error(err, ws)
         else:
@@ -40,6 +99,49 @@ class WebsocketHandler(web.View):
             self.request.app["websockets"].discard(ws)
         return ws
 
+    @staticmethod
+    def apply_command(game: Game, player: IPlayer, data: str | bytes) -> None:
+        # Cheapest checks first, so a flooding client costs as little as
+        # possible. Bad commands are dropped rather than closing the socket.
+        COMMANDS.inc()
+        player.seen = time.monotonic()
+        if len(data) > settings.WS_COMMAND_MAX_SIZE:
+            DROPPED_COMMANDS.inc(reason="oversized")
+        elif not player.limiter.allow():
+            DROPPED_COMMANDS.inc(reason="rate_limited")
+        elif not player.codec.is_input(data):
+            DROPPED_COMMANDS.inc(reason="malformed")
+        else:
+            try:
+                direction = decode_move(data)
+                if direction:
+                    game.apply_move(player, direction)
+                else:
+                    game.apply_input(player, *player.codec.decode_input(data))
+            except (CodecError, ValidationError):
+                DROPPED_COMMANDS.inc(reason="malformed")
+
+    @staticmethod
+    async def send_session(token: str, ws: web.WebSocketResponse) -> None:
+        await ws.send_json(
+            WsEvent(
+                data=WsSessionEvent(payload=WsSessionEventPayload(token=token))
+            ).dict()
+        )
+
+    @staticmethod
+    async def send_redirect(node: str, ws: web.WebSocketResponse) -> None:
+        host, _, port = node.rpartition(":")
+        logger.debug("Redirected player", extra={"node": node})
+        await ws.send_json(
+            WsEvent(
+                data=WsRedirectEvent(
+                    payload=WsRedirectEventPayload(host=host, port=int(port))
+                )
+            ).dict()
+        )
+        await ws.close()
+
     @staticmethod
     async def send_error(error: Exception, ws: web.WebSocketResponse) -> None:
         if isinstance(error, ValidationError):
@@ -47,7 +149,7 @@ class WebsocketHandler(web.View):
                 ";".join(" ".join(map(str, e.values())) for e in error.errors())
             )
             logger.warning(message)
-        if isinstance(error, DuplicatedIdError):
+        if isinstance(error, (DuplicatedIdError, UnknownGameError)):
             message = str(error)
             logger.warning(message)
         else:
@@ -60,20 +162,116 @@ class WebsocketHandler(web.View):
         )
 
 
+class SpectatorHandler(web.View):
+    async def get(self) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(
+            protocols=tuple(CODECS),
+            heartbeat=settings.WS_HEARTBEAT_TIMEOUT,
+            compress=self.request.app["compression"] != OFF,
+        )
+        await ws.prepare(self.request)
+        self.request.app["websockets"].add(ws)
+        try:
+            game = GamePool.get(self.request.match_info["game_id"])
+            if game is None:
+                raise UnknownGameError("Unknown game")
+            spectators = game.watch()
+            sender = spectators.add(ws)
+            GamePool.report_game(game)
+            try:
+                # Spectators are read-only, anything they send is ignored.
+                async for _ in ws:
+                    pass
+            finally:
+                spectators.remove(sender)
+                GamePool.report_game(game)
+        except Exception as err:  # pylint: disable=broad-except
+            await WebsocketHandler.send_error(err, ws)
+        finally:
+            self.request.app["websockets"].discard(ws)
+        return ws
+
+
+class GamesHandler(web.View):
+    async def get(self) -> web.Response:
+        return web.json_response(
+            [
+                {
+                    "id": game.uuid,
+                    "players": len(game.players),
+                    "spectators": len(game.spectators or ()),
+                }
+                for game in GamePool.games()
+            ]
+        )
+
+
 class IndexHandler(web.View):
     async def get(self) -> web.Response:
         return web.json_response({})
 
 
+class MemoryHandler(web.View):
+    async def get(self) -> web.Response:
+        return web.json_response(memory_report(GamePool.games()))
+
+
+class MetricsHandler(web.View):
+    async def get(self) -> web.Response:
+        return web.Response(
+            text=registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+
 async def on_shutdown(app: web.Application) -> None:
     for ws in set(app["websockets"]):
         await ws.close(code=WSCloseCode.GOING_AWAY, message="Server shutdown")
+    await GamePool.close()
 
 
-def get_application() -> web.Application:
+async def reaper(app: web.Application) -> AsyncIterator[None]:
+    task = asyncio.create_task(Reaper().run())
+    yield
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+async def on_cleanup(app: web.Application) -> None:
+    await app["matchmaker"].close()
+
+
+def get_application(
+    engine: str = settings.PHYSICS_ENGINE,
+    broker: str | None = None,
+    node: str | None = None,
+    replay_dir: str | None = settings.REPLAY_DIR,
+    compression: str = settings.WS_COMPRESSION,
+) -> web.Application:
+    scheduler.engine = get_engine(engine)
+    GamePool.replay_dir = replay_dir
+    FrameSender.compression = compression
     app = web.Application()
     app["websockets"] = weakref.WeakSet()
+    app["transports"] = weakref.WeakSet()
+    app["matchmaker"] = BrokerMatchmaker(broker) if broker else MemoryMatchmaker()
+    app["node"] = node or f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+    app["compression"] = compression
     app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+    app.cleanup_ctx.append(reaper)
     app.router.add_route("GET", "/", IndexHandler)
     app.router.add_route("GET", "/ws", WebsocketHandler)
+    app.router.add_route("GET", "/ws/spectate/{game_id}", SpectatorHandler)
+    app.router.add_route("GET", "/games", GamesHandler)
+    app.router.add_route("GET", "/metrics", MetricsHandler)
+    app.router.add_route("GET", "/debug/memory", MemoryHandler)
+    GAMES.set_callback(lambda: len(scheduler))
+    SEND_BACKLOG.set_callback(
+        lambda: sum(
+            transport.get_write_buffer_size()
+            for transport in app["transports"]
+            if not transport.is_closing()
+        )
+    )
     return app
@@ -1,41 +1,33 @@
-import math
 from dataclasses import dataclass
-from random import randint
+from dataclasses import field
+from random import Random
 from typing import Protocol
 
 from pongy import settings
-from pongy.models import WsBall
 
 
 class IBall(Protocol):
+    rng: Random
     speed: int
     angle: int
-    position: tuple[int, int]
-
-    def move(self) -> None:
-        pass
+    position: tuple[float, float]
 
     def change_speed(self) -> None:
         pass
 
-    def to_payload(self) -> WsBall:
-        pass
 
-
-@dataclass
+@dataclass(slots=True)
 class Ball:
+    # Also draws the ball's hit angles, so a seeded game plays out the same.
+    rng: Random = field(default_factory=Random, repr=False)
     speed: int = settings.DEFAULT_BALL_SPEED
-    angle: int = randint(20, 160)
-    position: tuple[int, int] = ((settings.BOARD_SIZE - settings.BALL_SIZE) // 2,) * 2
+    angle: int = field(init=False)
+    position: tuple[float, float] = (
+        float((settings.BOARD_SIZE - settings.BALL_SIZE) // 2),
+    ) * 2
 
-    def move(self) -> None:
-        radians = math.radians(self.angle)
-        new_x = self.position[0] + self.speed * math.cos(radians)
-        new_y = self.position[1] + self.speed * math.sin(radians)
-        self.position = int(new_x), int(new_y)
+    def __post_init__(self) -> None:
+        self.angle = self.rng.randint(20, 160)
 
     def change_speed(self) -> None:
-        self.speed = randint(settings.MIN_BALL_SPPED, settings.MAX_BALL_SPEED)
-
-    def to_payload(self) -> WsBall:
-        return WsBall(position=self.position)
+        self.speed = self.rng.randint(settings.MIN_BALL_SPPED, settings.MAX_BALL_SPEED)
@@ -0,0 +1,119 @@
+import math
+from typing import NamedTuple
+
+from pongy import settings
+from pongy.models import BoardSide
+from pongy.server.ball import IBall
+
+HIT_ANGLES = {
+    BoardSide.BOTTOM: (200, 340),
+    BoardSide.TOP: (20, 160),
+    BoardSide.LEFT: (-70, 70),
+    BoardSide.RIGHT: (110, 250),
+}
+
+# Lines the ball's top left corner can't cross: racket faces, then walls.
+# Bottom and right lines are crossed moving away from zero.
+RACKET_LINES = {
+    BoardSide.BOTTOM: settings.BOARD_SIZE - settings.BALL_SIZE - settings.RACKET_HEIGHT,
+    BoardSide.TOP: settings.RACKET_HEIGHT,
+    BoardSide.LEFT: settings.RACKET_HEIGHT,
+    BoardSide.RIGHT: settings.BOARD_SIZE - settings.BALL_SIZE - settings.RACKET_HEIGHT,
+}
+
+WALL_LINES = {
+    BoardSide.BOTTOM: settings.BOARD_SIZE - settings.BALL_SIZE,
+    BoardSide.TOP: 0,
+    BoardSide.LEFT: 0,
+    BoardSide.RIGHT: settings.BOARD_SIZE - settings.BALL_SIZE,
+}
+
+FAR_SIDES = (BoardSide.BOTTOM, BoardSide.RIGHT)
+
+HORIZONTAL_SIDES = (BoardSide.BOTTOM, BoardSide.TOP)
+
+# More contacts than this in one step leave the rest of the step unmoved.
+MAX_CONTACTS = 4
+
+
+class Contact(NamedTuple):
+    time: float
+    side: BoardSide
+    racket: bool
+    position: tuple[float, float]
+
+
+def crossing(start: float, delta: float, line: float, far: bool) -> float | None:
+    if far:
+        crossed = start <= line < start + delta
+    else:
+        crossed = start + delta < line <= start
+    return (line - start) / delta if crossed else None
+
+
+def find_contact(
+    x: float, y: float, dx: float, dy: float, rackets: dict[BoardSide, float]
+) -> Contact | None:
+    # The earliest line the step from (x, y) by (dx, dy) crosses, as a
+    # fraction of the step. A racket face only counts if the racket covers
+    # where the ball crosses it.
+    contact = None
+    for side, racket_line in RACKET_LINES.items():
+        far = side in FAR_SIDES
+        if side in HORIZONTAL_SIDES:
+            start, delta, along, along_delta = y, dy, x, dx
+        else:
+            start, delta, along, along_delta = x, dx, y, dy
+        time = crossing(start, delta, racket_line, far)
+        racket = False
+        if time is not None and side in rackets:
+            hit = along + along_delta * time
+            position = rackets[side]
+            racket = (
+                position - settings.BALL_SIZE
+                < hit
+                < position + settings.RACKET_LENGTH + settings.BALL_SIZE
+            )
+        line = racket_line if racket else WALL_LINES[side]
+        if not racket:
+            time = crossing(start, delta, line, far)
+        if time is None or (contact and contact.time <= time):
+            continue
+        along += along_delta * time
+        contact = Contact(
+            time,
+            side,
+            racket,
+            (along, line) if side in HORIZONTAL_SIDES else (line, along),
+        )
+    return contact
+
+
+def advance(ball: IBall, rackets: dict[BoardSide, float], dt: float) -> list[BoardSide]:
+    # Moves the ball along its path for dt seconds, bouncing it off rackets
+    # and walls at the exact contact point, and returns the walls it hit.
+    walls = []
+    remaining = dt
+    for _ in range(MAX_CONTACTS):
+        x, y = ball.position
+        radians = math.radians(ball.angle)
+        distance = ball.speed * remaining
+        dx = distance * math.cos(radians)
+        dy = distance * math.sin(radians)
+        contact = find_contact(x, y, dx, dy, rackets)
+        if contact is None:
+            ball.position = x + dx, y + dy
+            break
+        ball.position = contact.position
+        remaining *= 1 - contact.time
+        if contact.racket:
+            start, stop = HIT_ANGLES[contact.side]
+            ball.angle = ball.rng.randint(start, stop)
+            ball.change_speed()
+        else:
+            if contact.side in HORIZONTAL_SIDES:
+                ball.angle = -ball.angle
+            else:
+                ball.angle = 180 - ball.angle
+            walls.append(contact.side)
+    return walls
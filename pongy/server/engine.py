@@ -0,0 +1,77 @@
+import logging
+from typing import Protocol
+
+from pongy.codec import GameState
+from pongy.models import BoardSide
+from pongy.replay import ReplayRecorder
+from pongy.server.ball import IBall
+from pongy.server.player import IPlayer
+from pongy.server.racket import IRacket
+
+logger = logging.getLogger(__name__)
+
+
+class IGame(Protocol):
+    ball: IBall
+    players: list[IPlayer]
+    available_rackets: list[IRacket]
+    tick: int
+    recorder: ReplayRecorder | None
+
+    @property
+    def waiting(self) -> bool:
+        pass
+
+    def step(self, dt: float) -> None:
+        pass
+
+    def to_state(self) -> GameState:
+        pass
+
+    def bounce_notify(self, side: BoardSide) -> None:
+        pass
+
+    def broadcast(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class IEngine(Protocol):
+    def add(self, game: IGame) -> None:
+        pass
+
+    def remove(self, game: IGame) -> None:
+        pass
+
+    def step(self, dt: float) -> None:
+        pass
+
+
+class ScalarEngine:
+    def __init__(self) -> None:
+        self._games: dict[IGame, None] = {}
+
+    def add(self, game: IGame) -> None:
+        self._games[game] = None
+
+    def remove(self, game: IGame) -> None:
+        self._games.pop(game, None)
+
+    def step(self, dt: float) -> None:
+        for game in list(self._games):
+            try:
+                game.step(dt)
+            except Exception as err:  # pylint: disable=broad-except
+                logger.exception(err)
+
+
+def get_engine(name: str) -> IEngine:
+    if name == "numpy":
+        # numpy is an optional dependency, only required for this engine.
+        # pylint: disable=import-outside-toplevel
+        from pongy.server.vectorized import NumpyEngine
+
+        return NumpyEngine()
+    return ScalarEngine()
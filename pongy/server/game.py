@@ -1,30 +1,79 @@
 import asyncio
 import logging
+import os
+import random
+import secrets
+import time
+from random import Random
 from typing import Any
+from typing import Awaitable
+from typing import Callable
+from uuid import uuid4
+
+from aiohttp import WSCloseCode
 
 from pongy import settings
+from pongy.codec import GameState
+from pongy.codec import is_unchanged
 from pongy.models import BoardSide
-from pongy.models import WsEvent
-from pongy.models import WsGameStateEvent
-from pongy.models import WsGameStatePayload
+from pongy.models import MoveDirection
+from pongy.replay import ReplayRecorder
 from pongy.server.ball import Ball
 from pongy.server.ball import IBall
+from pongy.server.collision import advance
+from pongy.server.metrics import BROADCAST_ENCODE_DURATION
+from pongy.server.metrics import HELD_SESSIONS
+from pongy.server.metrics import PLAYERS
+from pongy.server.metrics import REAPED
+from pongy.server.metrics import RESUMED_SESSIONS
 from pongy.server.player import IPlayer
 from pongy.server.racket import BottomRacket
 from pongy.server.racket import IRacket
 from pongy.server.racket import LeftRacket
 from pongy.server.racket import RightRacket
 from pongy.server.racket import TopRacket
+from pongy.server.scheduler import scheduler
+from pongy.server.scheduler import TickScheduler
+from pongy.server.spectators import Spectators
 
 logger = logging.getLogger(__name__)
 
+# Connections closed cleanly or at shutdown leave at once, other closes hold
+# the player's slot for them to resume.
+LEAVE_CODES = (WSCloseCode.OK, WSCloseCode.GOING_AWAY)
+
 
 class DuplicatedIdError(Exception):
     pass
 
 
+class UnknownGameError(Exception):
+    pass
+
+
 class Game:
-    def __init__(self) -> None:
+    __slots__ = (
+        "uuid",
+        "seed",
+        "available_rackets",
+        "players",
+        "ball",
+        "tick",
+        "recorder",
+        "scheduler",
+        "spectators",
+        "moves",
+    )
+
+    def __init__(
+        self,
+        uuid: str | None = None,
+        recorder: ReplayRecorder | None = None,
+        seed: int | None = None,
+        tick_scheduler: TickScheduler = scheduler,
+    ) -> None:
+        self.uuid: str = uuid or str(uuid4())
+        self.seed: int = random.getrandbits(32) if seed is None else seed
         self.available_rackets: list[IRacket] = [
             RightRacket(),
             LeftRacket(),
@@ -32,69 +81,130 @@ class Game:
             BottomRacket(),
         ]
         self.players: list[IPlayer] = []
-        self.ball: IBall = Ball()
-        self._run_task: asyncio.Task[Any] = asyncio.create_task(self.run())
+        self.ball: IBall = Ball(Random(self.seed))
+        self.tick: int = 0
+        self.recorder: ReplayRecorder | None = recorder
+        self.scheduler: TickScheduler = tick_scheduler
+        self.spectators: Spectators | None = None
+        self.moves: dict[str, asyncio.TimerHandle] = {}
+        self.scheduler.add(self)
 
     def add_player(self, player: IPlayer) -> None:
-        if player.uuid in [p.uuid for p in self.players]:
-            raise DuplicatedIdError("Duplicated player uuid")
         player.racket = self.available_rackets.pop()
+        player.racket.active = True
         self.players.append(player)
         logger.debug("Added new player")
 
+    def resume_player(self, player: IPlayer) -> None:
+        self._cancel_move(player)
+        for index, held in enumerate(self.players):
+            if held.uuid == player.uuid:
+                player.racket = held.racket
+                player.score = held.score
+                player.input_seq = held.input_seq
+                self.players[index] = player
+        logger.debug("Resumed player")
+
     def remove_player(self, player: IPlayer) -> None:
+        self._cancel_move(player)
         player.racket.reset()
+        player.racket.active = False
         self.available_rackets.append(player.racket)
         self.players[:] = [p for p in self.players if p.uuid != player.uuid]
         logger.debug("Removed player")
         if self.is_empty:
-            self._run_task.cancel()
+            self.close()
+
+    def close(self) -> None:
+        self.scheduler.remove(self)
+        for release in self.moves.values():
+            release.cancel()
+        self.moves.clear()
+        if self.spectators:
+            self.spectators.close()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def watch(self) -> Spectators:
+        if self.spectators is None:
+            self.spectators = Spectators()
+        return self.spectators
+
+    def apply_input(
+        self, player: IPlayer, direction: MoveDirection | None, seq: int
+    ) -> None:
+        if player.apply_input(direction, seq) and self.recorder:
+            self.recorder.record_input(self.tick, player.racket.side, direction, seq)
+
+    def apply_move(self, player: IPlayer, direction: MoveDirection) -> None:
+        # Old clients send moves with no seq and no release, so a move is
+        # held input for one snapshot interval. Another move only extends
+        # the hold, so sending moves faster buys no speed.
+        if player.racket.direction != direction:
+            self.apply_input(player, direction, player.input_seq + 1)
+        self._cancel_move(player)
+        self.moves[player.uuid] = asyncio.get_running_loop().call_later(
+            1 / settings.SNAPSHOT_RATE, self._release_move, player
+        )
+
+    def _release_move(self, player: IPlayer) -> None:
+        del self.moves[player.uuid]
+        self.apply_input(player, None, player.input_seq + 1)
+
+    def _cancel_move(self, player: IPlayer) -> None:
+        if release := self.moves.pop(player.uuid, None):
+            release.cancel()
 
     def bounce_notify(self, side: BoardSide) -> None:
         for player in self.players:
             player.bounce_notify(side)
 
-    def bounce(self) -> None:
-        new_x, new_y = self.ball.position
-        if new_x < 0:
-            new_x = 0
-            self.ball.angle = 180 - self.ball.angle
-            self.bounce_notify(BoardSide.LEFT)
-        elif new_x > settings.BOARD_SIZE - settings.BALL_SIZE:
-            new_x = settings.BOARD_SIZE - settings.BALL_SIZE
-            self.ball.angle = 180 - self.ball.angle
-            self.bounce_notify(BoardSide.RIGHT)
-        if new_y < 0:
-            new_y = 0
-            self.ball.angle = -self.ball.angle
-            self.bounce_notify(BoardSide.TOP)
-        elif new_y > settings.BOARD_SIZE - settings.BALL_SIZE:
-            new_y = settings.BOARD_SIZE - settings.BALL_SIZE
-            self.ball.angle = -self.ball.angle
-            self.bounce_notify(BoardSide.BOTTOM)
-        self.ball.position = int(new_x), int(new_y)
-
-    def to_payload(self) -> WsGameStatePayload:
-        return WsGameStatePayload(
-            ball=self.ball.to_payload(),
-            players=[player.to_payload() for player in self.players],
+    def to_state(self) -> GameState:
+        ball_x, ball_y = self.ball.position
+        return GameState(
+            ball=(int(ball_x), int(ball_y)),
+            players=tuple(player.to_state() for player in self.players),
+            tick=self.tick,
         )
 
-    async def run(self) -> None:
-        while True:
-            asyncio.create_task(self.broadcast())
-            await asyncio.sleep(1 / settings.FPS)
-            self.ball.move()
-            for player in self.players:
-                player.racket.hit(self.ball)
-            self.bounce()
-
-    async def broadcast(self) -> None:
-        payload = WsEvent(data=WsGameStateEvent(payload=self.to_payload()))
-        await asyncio.gather(
-            *(subscriber.ws.send_json(payload.dict()) for subscriber in self.players),
-            return_exceptions=True
-        )
+    def step(self, dt: float) -> None:
+        self.tick += 1
+        rackets = {}
+        for player in self.players:
+            player.racket.step(dt)
+            rackets[player.racket.side] = player.racket.position
+        if self.waiting:
+            return
+        for side in advance(self.ball, rackets, dt):
+            self.bounce_notify(side)
+
+    def broadcast(self) -> None:
+        started = time.perf_counter()
+        state = self.to_state()
+        frames: dict[tuple[str, int | None], str | bytes] = {}
+        for subscriber in self.players:
+            if self.waiting and is_unchanged(subscriber.sent_state, state):
+                continue
+            subscriber.coalesce()
+            base = subscriber.codec.baseline(state, subscriber.sent_state)
+            key = subscriber.codec.protocol, base.tick if base else None
+            if key not in frames:
+                # A state one codec can't encode only costs its subscribers
+                # this frame, the others still get theirs.
+                try:
+                    frames[key] = subscriber.codec.encode(state, base)
+                except Exception as err:  # pylint: disable=broad-except
+                    logger.exception(err)
+                    continue
+            subscriber.send(frames[key], state)
+        BROADCAST_ENCODE_DURATION.observe(time.perf_counter() - started)
+        if self.spectators:
+            self.spectators.broadcast(state, frames, self.waiting)
+
+    @property
+    def waiting(self) -> bool:
+        return len(self.players) < settings.GAME_MIN_PLAYERS
 
     @property
     def is_full(self) -> bool:
@@ -106,25 +216,206 @@ class Game:
 
 
 class GamePool:
-    _awaiting: Game | None = None
+    # Games by id, ids of games with free seats, and games by player id, so
+    # duplicate and reconnecting players are found without scanning games.
+    # A player whose connection drops keeps their slot and score for
+    # SESSION_RESUME_TIMEOUT seconds, and a connection with their id and
+    # session token takes them back, even from a connection not yet noticed
+    # to be dead; the seat is released to the matchmaker when that runs out.
+    # Worker processes set a queue to get seats and game counts as changes.
+    replay_dir: str | None = settings.REPLAY_DIR
+    reports: "asyncio.Queue[dict[str, Any]] | None" = None
+    _games: dict[str, Game] = {}
+    _open: set[str] = set()
+    _players: dict[str, "GamePool"] = {}
+    _held: dict[str, "GamePool"] = {}
+    _closed: set[str] = set()
 
-    def __init__(self, player: IPlayer) -> None:
+    def __init__(
+        self,
+        player: IPlayer,
+        game_id: str,
+        release: Callable[[str], Awaitable[None]],
+        resume_timeout: float = settings.SESSION_RESUME_TIMEOUT,
+        token: str | None = None,
+    ) -> None:
         self._player: IPlayer = player
+        self._presented = token
+        self.token: str = secrets.token_urlsafe()
+        self._game_id: str = game_id
+        self._release = release
+        self._resume_timeout = resume_timeout
         self._game: Game | None = None
+        self._expiry: asyncio.TimerHandle | None = None
+        self._seated = False
+        self.close_reason: tuple[WSCloseCode, bytes] | None = None
 
-    async def __aenter__(self) -> Game:
-        if not GamePool._awaiting:
-            self._game = GamePool._awaiting = Game()
-            logger.debug("Created new game")
+    @staticmethod
+    def is_awaiting() -> bool:
+        return bool(GamePool._open)
+
+    @staticmethod
+    def games() -> list[Game]:
+        return list(GamePool._games.values())
+
+    @staticmethod
+    def report(**changes: Any) -> None:
+        if GamePool.reports is not None:
+            GamePool.reports.put_nowait(changes)
+
+    @staticmethod
+    def report_game(game: Game, **changes: Any) -> None:
+        if game.uuid in GamePool._games:
+            counts = [len(game.players), len(game.spectators or ())]
+            changes["games"] = {game.uuid: counts}
         else:
-            self._game = GamePool._awaiting
-        self._game.add_player(self._player)
-        if self._game.is_full:
-            GamePool._awaiting = None
-        return self._game
+            changes["ended"] = [game.uuid]
+        GamePool.report(**changes)
+
+    @staticmethod
+    def get(game_id: str) -> Game | None:
+        return GamePool._games.get(game_id)
+
+    @staticmethod
+    def find(player_id: str) -> Game | None:
+        pool = GamePool._players.get(player_id)
+        return pool._game if pool else None
+
+    @staticmethod
+    async def close() -> None:
+        for pool in list(GamePool._held.values()):
+            await pool._leave()
+
+    @staticmethod
+    async def reap(idle_timeout: float) -> None:
+        # A socket closes a moment before its handler leaves the game, so
+        # only players found closed by two sweeps in a row are removed.
+        now = time.monotonic()
+        closed = set()
+        for uuid, pool in list(GamePool._players.items()):
+            player = pool._player
+            if uuid in GamePool._held:
+                continue
+            if player.ws.closed:
+                if uuid in GamePool._closed:
+                    REAPED.inc(reason="dead_player")
+                    await pool._leave()
+                else:
+                    closed.add(uuid)
+            elif pool._game and pool._game.waiting:
+                # There is nothing to do while waiting for players, so the
+                # idle time only starts once the game does.
+                player.seen = now
+            elif now - player.seen > idle_timeout:
+                REAPED.inc(reason="idle_player")
+                pool._disconnect(WSCloseCode.POLICY_VIOLATION, b"Idle")
+        GamePool._closed = closed
+
+    async def __aenter__(self) -> Game:
+        if self._player.uuid in GamePool._players:
+            return self._resume()
+        game = GamePool._games.get(self._game_id)
+        if game is None:
+            recorder = None
+            if GamePool.replay_dir:
+                recorder = ReplayRecorder(
+                    os.path.join(GamePool.replay_dir, f"{self._game_id}.replay")
+                )
+            game = GamePool._games[self._game_id] = Game(self._game_id, recorder)
+            GamePool._open.add(game.uuid)
+            logger.debug("Created new game", extra={"seed": game.seed})
+        try:
+            game.add_player(self._player)
+        except Exception:
+            await self._release(self._player.uuid)
+            raise
+        finally:
+            self._update(game)
+        self._game = game
+        GamePool._players[self._player.uuid] = self
+        GamePool.report(joined=[self._player.uuid])
+        self._seated = True
+        PLAYERS.inc()
+        return game
 
     async def __aexit__(self, *args: tuple[Any, ...]) -> None:
-        if self._game:
-            self._game.remove_player(self._player)
-            if GamePool._awaiting is self._game and self._game.is_empty:
-                GamePool._awaiting = None
+        self._unseat()
+        if self._game is None:
+            return
+        if self.close_reason or self._player.ws.close_code in LEAVE_CODES:
+            await self._leave()
+            return
+        self._player.racket.direction = None
+        self._expiry = asyncio.get_running_loop().call_later(
+            self._resume_timeout, lambda: asyncio.create_task(self._leave())
+        )
+        GamePool._held[self._player.uuid] = self
+        HELD_SESSIONS.inc()
+        logger.debug("Holding player slot")
+
+    def _resume(self) -> Game:
+        held = GamePool._players[self._player.uuid]
+        if self._presented is None or not secrets.compare_digest(
+            self._presented, held.token
+        ):
+            raise DuplicatedIdError("Duplicated player uuid")
+        if GamePool._held.pop(self._player.uuid, None):
+            if held._expiry:
+                held._expiry.cancel()
+            HELD_SESSIONS.dec()
+            PLAYERS.inc()
+        else:
+            held._seated = False
+            # A dropped connection often stays half open until the heartbeat
+            # notices, so the new one takes the session over from it.
+            held._disconnect(WSCloseCode.GOING_AWAY, b"Replaced")
+        game, held._game = held._game, None
+        if game is None:
+            raise RuntimeError("Resumed session has no game")
+        RESUMED_SESSIONS.inc()
+        self._seated = True
+        self._game = game
+        self.token = held.token
+        GamePool._players[self._player.uuid] = self
+        game.resume_player(self._player)
+        return game
+
+    def _disconnect(self, code: WSCloseCode, message: bytes) -> None:
+        # Closing breaks the handler's receive loop, and aiohttp closes with
+        # OK once the handler returns, so the handler sends this code itself.
+        self.close_reason = code, message
+        asyncio.create_task(self._player.ws.close(code=code, message=message))
+
+    def _unseat(self) -> None:
+        # A connected player is counted once, whichever of their handler and
+        # the reaper lets go of them first.
+        if self._seated:
+            self._seated = False
+            PLAYERS.dec()
+
+    async def _leave(self) -> None:
+        self._unseat()
+        if self._game is None:
+            return
+        if GamePool._held.pop(self._player.uuid, None):
+            HELD_SESSIONS.dec()
+            if self._expiry:
+                self._expiry.cancel()
+        self._game.remove_player(self._player)
+        del GamePool._players[self._player.uuid]
+        GamePool.report(left=[self._player.uuid])
+        self._update(self._game)
+        self._game = None
+        await self._release(self._player.uuid)
+
+    @staticmethod
+    def _update(game: Game) -> None:
+        if game.is_empty:
+            GamePool._games.pop(game.uuid, None)
+            GamePool._open.discard(game.uuid)
+            game.scheduler.remove(game)
+        elif game.is_full:
+            GamePool._open.discard(game.uuid)
+        else:
+            GamePool._open.add(game.uuid)
+        GamePool.report_game(game, awaiting=GamePool.is_awaiting())
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+from typing import NamedTuple
+from typing import Protocol
+from uuid import uuid4
+
+from pongy import settings
+
+logger = logging.getLogger(__name__)
+
+SEATS = 4
+
+
+class MatchmakingError(Exception):
+    pass
+
+
+class Assignment(NamedTuple):
+    game_id: str
+    node: str
+
+
+class IMatchmaker(Protocol):
+    async def assign(self, player_id: str, node: str) -> Assignment:
+        pass
+
+    async def release(self, player_id: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryMatchmaker:
+    # Players are put into the fullest game with a free seat, and a new game
+    # is only opened when there is none. Games with free seats are indexed by
+    # taken seats, so both take constant time. A game is owned by the node of
+    # the player who opened it; players assigned to a game on another node
+    # hold a reserved seat until they reconnect to that node or the
+    # reservation expires.
+    def __init__(
+        self, reservation_timeout: float = settings.MATCHMAKING_RESERVATION_TIMEOUT
+    ) -> None:
+        self._reservation_timeout = reservation_timeout
+        self._seats: dict[str, int] = {}
+        self._open: list[dict[str, Assignment]] = [{} for _ in range(SEATS + 1)]
+        self._players: dict[str, Assignment] = {}
+        self._reserved: dict[str, float] = {}
+
+    async def assign(self, player_id: str, node: str) -> Assignment:
+        self._expire_reservations()
+        assignment = self._players.get(player_id)
+        if assignment is None:
+            assignment = self._fullest_open() or Assignment(
+                game_id=str(uuid4()), node=node
+            )
+            self._players[player_id] = assignment
+            self._take_seats(assignment, 1)
+        if assignment.node == node:
+            self._reserved.pop(player_id, None)
+        else:
+            self._reserved[player_id] = time.monotonic() + self._reservation_timeout
+        return assignment
+
+    async def release(self, player_id: str) -> None:
+        self._release(player_id)
+
+    async def close(self) -> None:
+        pass
+
+    def _release(self, player_id: str) -> None:
+        self._reserved.pop(player_id, None)
+        assignment = self._players.pop(player_id, None)
+        if assignment is not None:
+            self._take_seats(assignment, -1)
+
+    def _fullest_open(self) -> Assignment | None:
+        for games in reversed(self._open):
+            if games:
+                return next(iter(games.values()))
+        return None
+
+    def _take_seats(self, assignment: Assignment, count: int) -> None:
+        seats = self._seats.pop(assignment.game_id, 0)
+        self._open[seats].pop(assignment.game_id, None)
+        seats += count
+        if seats:
+            self._seats[assignment.game_id] = seats
+        if 0 < seats < SEATS:
+            self._open[seats][assignment.game_id] = assignment
+
+    def _expire_reservations(self) -> None:
+        now = time.monotonic()
+        for player_id, deadline in list(self._reserved.items()):
+            if deadline < now:
+                logger.debug("Reservation expired", extra={"player_id": player_id})
+                self._release(player_id)
+
+
+async def open_connection(
+    address: str,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    host, separator, port = address.rpartition(":")
+    if separator:
+        return await asyncio.open_connection(host, int(port))
+    return await asyncio.open_unix_connection(address)
+
+
+class BrokerMatchmaker:
+    # Client of a BrokerServer shared by several nodes, speaking one JSON
+    # object per line over TCP ("host:port") or a Unix socket (a path).
+    def __init__(self, address: str) -> None:
+        self._address = address
+        self._lock = asyncio.Lock()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def assign(self, player_id: str, node: str) -> Assignment:
+        response = await self._request(
+            {"op": "assign", "player_id": player_id, "node": node}
+        )
+        return Assignment(game_id=response["game_id"], node=response["node"])
+
+    async def release(self, player_id: str) -> None:
+        await self._request({"op": "release", "player_id": player_id})
+
+    async def close(self) -> None:
+        if self._writer:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def _request(self, request: dict[str, str]) -> dict[str, Any]:
+        async with self._lock:
+            try:
+                if self._reader is None or self._writer is None:
+                    self._reader, self._writer = await open_connection(self._address)
+                self._writer.write(json.dumps(request).encode() + b"\n")
+                await self._writer.drain()
+                line = await self._reader.readline()
+                if not line:
+                    raise ConnectionError("Broker closed connection")
+            except (OSError, ConnectionError) as err:
+                await self.close()
+                raise MatchmakingError("Matchmaking broker is unavailable") from err
+        response: dict[str, Any] = json.loads(line)
+        if "error" in response:
+            raise MatchmakingError(response["error"])
+        return response
+
+
+class BrokerServer:
+    def __init__(self, matchmaker: IMatchmaker | None = None) -> None:
+        self._matchmaker: IMatchmaker = matchmaker or MemoryMatchmaker()
+
+    async def serve(self, address: str) -> None:
+        host, separator, port = address.rpartition(":")
+        if separator:
+            server = await asyncio.start_server(self._handle, host, int(port))
+        else:
+            server = await asyncio.start_unix_server(self._handle, address)
+        logger.info("Matchmaking broker started", extra={"address": address})
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            async for line in reader:
+                writer.write(json.dumps(await self._dispatch(line)).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            logger.debug("Broker client disconnected")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, line: bytes) -> dict[str, str]:
+        try:
+            request = json.loads(line)
+            if request["op"] == "assign":
+                assignment = await self._matchmaker.assign(
+                    request["player_id"], request["node"]
+                )
+                return assignment._asdict()
+            if request["op"] == "release":
+                await self._matchmaker.release(request["player_id"])
+                return {}
+            return {"error": f"Unknown operation {request['op']}"}
+        except (ValueError, KeyError, TypeError) as err:
+            return {"error": f"Malformed request {err}"}
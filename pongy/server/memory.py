@@ -0,0 +1,107 @@
+import sys
+from typing import Any
+from typing import Iterable
+
+from pongy.codec import GameState
+from pongy.server.game import Game
+from pongy.server.player import IPlayer
+
+
+def state_size(state: GameState | None) -> int:
+    if state is None:
+        return 0
+    return (
+        sys.getsizeof(state)
+        + sys.getsizeof(state.ball)
+        + sys.getsizeof(state.players)
+        + sum(
+            sys.getsizeof(player) + sys.getsizeof(player.uuid)
+            for player in state.players
+        )
+    )
+
+
+def game_size(game: Game) -> int:
+    # What the game holds itself, its players are connections.
+    rackets = [*game.available_rackets, *(player.racket for player in game.players)]
+    return sum(
+        map(
+            sys.getsizeof,
+            (
+                game,
+                game.uuid,
+                game.ball,
+                game.ball.rng,
+                game.ball.position,
+                game.players,
+                game.available_rackets,
+                *rackets,
+            ),
+        )
+    )
+
+
+def buffer_sizes(player: IPlayer) -> dict[str, int]:
+    # Bytes waiting in the send queue, the transport write buffer and the
+    # aiohttp read queue. aiohttp has no public API for the last two.
+    # pylint: disable=protected-access
+    ws = player.ws
+    writer = ws._writer
+    reader = ws._reader
+    return {
+        "send_queue": player.sender.queued_bytes,
+        "write_buffer": (
+            writer.transport.get_write_buffer_size()
+            if writer is not None and not writer.transport.is_closing()
+            else 0
+        ),
+        "read_buffer": reader._size if reader is not None else 0,
+    }
+
+
+def connection_size(player: IPlayer) -> int:
+    return (
+        sum(
+            map(
+                sys.getsizeof,
+                (
+                    player,
+                    player.uuid,
+                    player.codec,
+                    player.sender,
+                    player.limiter,
+                    player.ws,
+                ),
+            )
+        )
+        + state_size(player.sent_state)
+        + sum(buffer_sizes(player).values())
+    )
+
+
+def summary(sizes: list[int]) -> dict[str, Any]:
+    return {
+        "count": len(sizes),
+        "total": sum(sizes),
+        "mean": round(sum(sizes) / len(sizes)) if sizes else 0,
+        "max": max(sizes, default=0),
+    }
+
+
+def memory_report(games: Iterable[Game]) -> dict[str, Any]:
+    # Shallow sizes of the objects a game and a connection own, so
+    # shared objects like codecs' structs and the event loop aren't counted.
+    game_sizes = []
+    connection_sizes = []
+    buffers = {"send_queue": 0, "write_buffer": 0, "read_buffer": 0}
+    for game in games:
+        game_sizes.append(game_size(game))
+        for player in game.players:
+            connection_sizes.append(connection_size(player))
+            for name, size in buffer_sizes(player).items():
+                buffers[name] += size
+    return {
+        "games": summary(game_sizes),
+        "connections": summary(connection_sizes),
+        "buffers": buffers,
+    }
@@ -0,0 +1,201 @@
+import bisect
+from typing import Callable
+from typing import Protocol
+
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class IMetric(Protocol):
+    name: str
+
+    def render(self) -> list[str]:
+        pass
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, IMetric] = {}
+
+    def register(self, metric: IMetric) -> None:
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class Counter:
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self._description = description
+        self._values: dict[Labels, float] = {}
+        registry.register(self)
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items())) if labels else ()
+        self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self._description}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in self._values.items() or [((), 0.0)]:
+            lines.append(f"{self.name}{format_labels(labels)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self._description = description
+        self._value: float = 0
+        self._callback: Callable[[], float] | None = None
+        registry.register(self)
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, value: float = 1) -> None:
+        self._value += value
+
+    def dec(self, value: float = 1) -> None:
+        self._value -= value
+
+    def set_callback(self, callback: Callable[[], float]) -> None:
+        self._callback = callback
+
+    def value(self) -> float:
+        return self._callback() if self._callback else self._value
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self._description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.value()}",
+        ]
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self._description = description
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum: float = 0
+        registry.register(self)
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._sum += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self._description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        cumulative = 0
+        for bucket, count in zip(self._buckets, self._counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bucket}"}} {cumulative}')
+        cumulative += self._counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self._sum}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+GAMES = Gauge("pongy_games", "Live games.")
+
+PLAYERS = Gauge("pongy_players", "Players connected to a game.")
+
+TICK_DURATION = Histogram(
+    "pongy_tick_duration_seconds", "Time to step and broadcast all games."
+)
+
+TICK_OVERRUNS = Counter(
+    "pongy_tick_overruns_total", "Ticks that missed their deadline."
+)
+
+BROADCAST_ENCODE_DURATION = Histogram(
+    "pongy_broadcast_encode_seconds", "Time to encode one game state for its players."
+)
+
+FRAME_SEND_DURATION = Histogram(
+    "pongy_frame_send_seconds", "Time to write one frame to a WebSocket."
+)
+
+OUTBOUND_BYTES = Counter("pongy_outbound_bytes_total", "Bytes of frames sent.")
+
+OUTBOUND_FRAMES = Counter("pongy_outbound_frames_total", "Frames sent.")
+
+SEND_BACKLOG = Gauge(
+    "pongy_ws_send_backlog_bytes", "Bytes buffered in WebSocket transports."
+)
+
+SEND_QUEUE = Gauge("pongy_ws_send_queue_frames", "Frames waiting in send queues.")
+
+DROPPED_FRAMES = Counter(
+    "pongy_dropped_frames_total", "Stale frames dropped for slow clients."
+)
+
+SLOW_DISCONNECTS = Counter(
+    "pongy_slow_disconnects_total", "Clients disconnected for staying behind."
+)
+
+COMMANDS = Counter("pongy_commands_total", "Commands received from players.")
+
+DROPPED_COMMANDS = Counter(
+    "pongy_dropped_commands_total", "Commands dropped unapplied, by reason."
+)
+
+HELD_SESSIONS = Gauge(
+    "pongy_held_sessions", "Dropped players whose slot is held for them to resume."
+)
+
+RESUMED_SESSIONS = Counter(
+    "pongy_resumed_sessions_total", "Dropped players who resumed their slot."
+)
+
+REAPED = Counter(
+    "pongy_reaped_total", "Dead or idle connections and orphaned games, by reason."
+)
+
+SPECTATORS = Gauge("pongy_spectators", "Viewers watching games.")
+
+SPECTATOR_FANOUT_DURATION = Histogram(
+    "pongy_spectator_fanout_seconds", "Time to hand one state to a game's viewers."
+)
@@ -1,39 +1,101 @@
+import time
 from dataclasses import dataclass
+from dataclasses import field
 from typing import Protocol
 
 from aiohttp import web
 
+from pongy.codec import GameState
+from pongy.codec import ICodec
+from pongy.codec import JsonCodec
+from pongy.codec import PlayerState
 from pongy.models import BoardSide
-from pongy.models import WsPlayer
+from pongy.models import MoveDirection
 from pongy.server.racket import BaseRacket
 from pongy.server.racket import IRacket
+from pongy.server.ratelimit import TokenBucket
+from pongy.server.sender import FrameSender
 
 
 class IPlayer(Protocol):
     uuid: str
     ws: web.WebSocketResponse
+    codec: ICodec
     score: int
     racket: IRacket
+    sent_state: GameState | None
+    sender: FrameSender
+    limiter: TokenBucket
+    input_seq: int
+    seen: float
+
+    def apply_input(self, direction: MoveDirection | None, seq: int) -> bool:
+        pass
 
     def bounce_notify(self, side: BoardSide) -> None:
         pass
 
-    def to_payload(self) -> WsPlayer:
+    def coalesce(self) -> None:
+        pass
+
+    def send(self, frame: str | bytes, state: GameState) -> None:
         pass
 
+    def close(self) -> None:
+        pass
+
+    def to_state(self) -> PlayerState:
+        pass
 
-@dataclass
+
+@dataclass(slots=True)
 class Player:
     uuid: str
     ws: web.WebSocketResponse
+    codec: ICodec = JsonCodec()
     score: int = 0
     racket: IRacket = BaseRacket()
+    sent_state: GameState | None = None
+    sender: FrameSender = field(init=False)
+    limiter: TokenBucket = field(init=False)
+    input_seq: int = 0
+    seen: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self.sender = FrameSender(self.ws)
+        self.limiter = TokenBucket()
+
+    def apply_input(self, direction: MoveDirection | None, seq: int) -> bool:
+        # Input is held state, so an older one must not replace a newer one.
+        if seq <= self.input_seq:
+            return False
+        self.input_seq = seq
+        self.racket.direction = direction
+        return True
 
     def bounce_notify(self, side: BoardSide) -> None:
         if self.racket.side == side:
             self.score += 1
 
-    def to_payload(self) -> WsPlayer:
-        return WsPlayer(
-            uuid=self.uuid, score=self.score, racket=self.racket.to_payload()
+    def coalesce(self) -> None:
+        # Queued frames are stale by now, and deltas based on them are
+        # useless once dropped, so the next frame must be a keyframe.
+        if self.sender.is_full:
+            self.sender.drop()
+            self.sent_state = None
+
+    def send(self, frame: str | bytes, state: GameState) -> None:
+        self.sent_state = state
+        self.sender.push(frame)
+
+    def close(self) -> None:
+        self.sender.close()
+
+    def to_state(self) -> PlayerState:
+        return PlayerState(
+            uuid=self.uuid,
+            score=self.score,
+            side=self.racket.side,
+            position=round(self.racket.position),
+            seq=self.input_seq,
         )
@@ -0,0 +1,29 @@
+import time
+
+from pongy import settings
+
+
+class TokenBucket:
+    # Allows bursts of up to burst commands, refilled at rate per second.
+    __slots__ = ("_rate", "_burst", "_tokens", "_updated")
+
+    def __init__(
+        self,
+        rate: float = settings.WS_COMMAND_RATE,
+        burst: int = settings.WS_COMMAND_BURST,
+    ) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._tokens: float = burst
+        self._updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+from pongy import settings
+from pongy.server.game import GamePool
+from pongy.server.metrics import REAPED
+from pongy.server.scheduler import scheduler
+from pongy.server.scheduler import TickScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Reaper:
+    # Sweeps up what lost connections leave behind, so dead sockets don't
+    # keep games ticking. Games the scheduler still steps with no pool
+    # tracking them are closed as well, like games their last player left.
+    def __init__(
+        self,
+        tick_scheduler: TickScheduler = scheduler,
+        interval: float = settings.REAPER_INTERVAL,
+        idle_timeout: float = settings.WS_IDLE_TIMEOUT,
+    ) -> None:
+        self._scheduler = tick_scheduler
+        self._interval = interval
+        self._idle_timeout = idle_timeout
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.reap()
+            except Exception as err:  # pylint: disable=broad-except
+                logger.exception(err)
+
+    async def reap(self) -> None:
+        await GamePool.reap(self._idle_timeout)
+        games = set(GamePool.games())
+        for game in self._scheduler.games:
+            if game not in games:
+                REAPED.inc(reason="orphaned_game")
+                game.close()
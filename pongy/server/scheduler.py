@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Any
+
+from pongy import settings
+from pongy.server.engine import get_engine
+from pongy.server.engine import IEngine
+from pongy.server.engine import IGame
+from pongy.server.metrics import TICK_DURATION
+from pongy.server.metrics import TICK_OVERRUNS
+
+logger = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    def __init__(
+        self,
+        tick_rate: int = settings.TICK_RATE,
+        snapshot_rate: int = settings.SNAPSHOT_RATE,
+        engine: str = settings.PHYSICS_ENGINE,
+        headless: bool = False,
+    ) -> None:
+        self.engine: IEngine = get_engine(engine)
+        # Headless schedulers never start a task or broadcast, games on them
+        # are only stepped by advance().
+        self.headless: bool = headless
+        self.interval: float = 1 / tick_rate
+        self.snapshot_every: int = max(1, tick_rate // snapshot_rate)
+        self.tick: int = 0
+        self.overruns: int = 0
+        self.last_duration: float = 0.0
+        self._games: dict[IGame, None] = {}
+        self._task: asyncio.Task[Any] | None = None
+
+    def add(self, game: IGame) -> None:
+        self._games[game] = None
+        self.engine.add(game)
+        if self._task is None and not self.headless:
+            self._task = asyncio.create_task(self.run())
+
+    def remove(self, game: IGame) -> None:
+        self._games.pop(game, None)
+        self.engine.remove(game)
+        if not self._games and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    @property
+    def games(self) -> list[IGame]:
+        return list(self._games)
+
+    def advance(self, ticks: int = 1) -> None:
+        for _ in range(ticks):
+            games = list(self._games)
+            # Physics always advances by a whole interval, a late tick is
+            # not stretched to cover the delay.
+            self.engine.step(self.interval)
+            self.tick += 1
+            for game in games:
+                if not game.recorder:
+                    continue
+                # A game that can't be recorded carries on unrecorded, rather
+                # than stopping every game on the scheduler.
+                try:
+                    game.recorder.record(game.to_state())
+                except Exception as err:  # pylint: disable=broad-except
+                    logger.exception(err)
+                    game.recorder.close()
+                    game.recorder = None
+            if self.headless or self.tick % self.snapshot_every:
+                continue
+            for game in games:
+                try:
+                    game.broadcast()
+                except Exception as err:  # pylint: disable=broad-except
+                    logger.exception(err)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            started = loop.time()
+            self.advance()
+            finished = loop.time()
+            self.last_duration = finished - started
+            TICK_DURATION.observe(self.last_duration)
+            # Sleep until the next deadline rather than for a whole interval,
+            # so step time doesn't accumulate into drift.
+            deadline += self.interval
+            if finished > deadline:
+                self.overruns += 1
+                TICK_OVERRUNS.inc()
+                logger.warning(
+                    "Tick overrun",
+                    extra={
+                        "tick": self.tick,
+                        "duration": self.last_duration,
+                        "behind": finished - deadline,
+                        "games": len(self._games),
+                    },
+                )
+                deadline = finished
+            await asyncio.sleep(deadline - finished)
+
+
+scheduler = TickScheduler()
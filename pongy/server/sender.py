@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from aiohttp import web
+from aiohttp import WSCloseCode
+
+from pongy import settings
+from pongy.compression import send_compress
+from pongy.server.metrics import DROPPED_FRAMES
+from pongy.server.metrics import FRAME_SEND_DURATION
+from pongy.server.metrics import OUTBOUND_BYTES
+from pongy.server.metrics import OUTBOUND_FRAMES
+from pongy.server.metrics import SEND_QUEUE
+from pongy.server.metrics import SLOW_DISCONNECTS
+
+logger = logging.getLogger(__name__)
+
+
+class FrameSender:
+    # Per-connection bounded frame queue drained by one long-lived writer
+    # task, so a slow client never holds up the tick loop or other players.
+    # Frames a client can't keep up with are dropped, and a client that stays
+    # behind for longer than max_lag seconds is disconnected. The queue is
+    # a few frames deep, so a list and a future to wake the writer cost less
+    # per connection than a deque and an event.
+    __slots__ = (
+        "_ws",
+        "_depth",
+        "_max_lag",
+        "_queue",
+        "_waiter",
+        "_task",
+        "_behind_since",
+        "_disconnecting",
+        "dropped",
+        "_compress",
+    )
+    compression: str = settings.WS_COMPRESSION
+
+    def __init__(
+        self,
+        ws: web.WebSocketResponse,
+        depth: int = settings.WS_SEND_QUEUE_DEPTH,
+        max_lag: float = settings.WS_SEND_MAX_LAG,
+    ) -> None:
+        self._ws = ws
+        self._depth = depth
+        self._max_lag = max_lag
+        self._queue: list[str | bytes] = []
+        self._waiter: asyncio.Future[None] | None = None
+        self._task: asyncio.Task[Any] | None = None
+        self._behind_since: float | None = None
+        self._disconnecting = False
+        self.dropped: int = 0
+        self._compress: int | None = send_compress(self.compression, ws.compress)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._queue) >= self._depth
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def queued_bytes(self) -> int:
+        return sum(len(frame) for frame in self._queue)
+
+    def drop(self) -> None:
+        dropped = len(self._queue)
+        self._queue.clear()
+        self.dropped += dropped
+        DROPPED_FRAMES.inc(dropped)
+        SEND_QUEUE.dec(dropped)
+        now = time.monotonic()
+        if self._behind_since is None:
+            self._behind_since = now
+        elif now - self._behind_since > self._max_lag:
+            self._disconnect()
+
+    def push(self, frame: str | bytes) -> None:
+        if self._ws.closed or self._disconnecting:
+            return
+        if self.is_full:
+            self.drop()
+        self._queue.append(frame)
+        SEND_QUEUE.inc()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        SEND_QUEUE.dec(len(self._queue))
+        self._queue.clear()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._waiter = asyncio.get_running_loop().create_future()
+                    await self._waiter
+                    self._waiter = None
+                while self._queue:
+                    frame = self._queue.pop(0)
+                    SEND_QUEUE.dec()
+                    started = time.perf_counter()
+                    if isinstance(frame, bytes):
+                        await self._ws.send_bytes(
+                            frame, compress=self._compress  # type: ignore[arg-type]
+                        )
+                    else:
+                        await self._ws.send_str(
+                            frame, compress=self._compress  # type: ignore[arg-type]
+                        )
+                    FRAME_SEND_DURATION.observe(time.perf_counter() - started)
+                    OUTBOUND_FRAMES.inc()
+                    OUTBOUND_BYTES.inc(len(frame))
+                self._behind_since = None
+        except ConnectionError as err:
+            logger.debug("Stopped sending frames: %s", err)
+            SEND_QUEUE.dec(len(self._queue))
+            self._queue.clear()
+
+    def _disconnect(self) -> None:
+        self._disconnecting = True
+        SLOW_DISCONNECTS.inc()
+        logger.warning("Disconnecting slow client", extra={"dropped": self.dropped})
+        asyncio.create_task(
+            self._ws.close(code=WSCloseCode.TRY_AGAIN_LATER, message=b"Too slow")
+        )
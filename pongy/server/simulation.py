@@ -0,0 +1,60 @@
+import logging
+import time
+
+from aiohttp import web
+
+from pongy import settings
+from pongy.server.game import Game
+from pongy.server.player import Player
+from pongy.server.scheduler import TickScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Simulation:
+    # Games on a headless scheduler of their own, stepped with no event loop,
+    # sleeps or network, as fast as the CPU allows.
+    def __init__(
+        self,
+        engine: str = settings.PHYSICS_ENGINE,
+        tick_rate: int = settings.TICK_RATE,
+    ) -> None:
+        self.scheduler = TickScheduler(tick_rate, engine=engine, headless=True)
+        self.games: list[Game] = []
+
+    def add_game(self, seed: int | None = None, players: int = 4) -> Game:
+        game = Game(seed=seed, tick_scheduler=self.scheduler)
+        for index in range(players):
+            # Headless games never broadcast, so the websocket is never used.
+            game.add_player(Player(uuid=f"bot-{index}", ws=web.WebSocketResponse()))
+        self.games.append(game)
+        return game
+
+    def run(self, ticks: int) -> None:
+        self.scheduler.advance(ticks)
+
+
+def run_simulation(
+    engine: str, games: int, ticks: int, seed: int | None = None
+) -> Simulation:
+    simulation = Simulation(engine)
+    for index in range(games):
+        simulation.add_game(None if seed is None else seed + index)
+    started = time.perf_counter()
+    simulation.run(ticks)
+    duration = time.perf_counter() - started
+    logger.info(
+        "Simulation report",
+        extra={
+            "engine": engine,
+            "games": games,
+            "ticks": ticks,
+            "seconds": round(duration, 3),
+            "ticks_per_second": round(ticks / duration),
+            "game_ticks_per_second": round(games * ticks / duration),
+            "scores": [
+                [player.score for player in game.players] for game in simulation.games
+            ],
+        },
+    )
+    return simulation
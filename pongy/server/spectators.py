@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+from aiohttp import WSCloseCode
+
+from pongy import settings
+from pongy.codec import GameState
+from pongy.codec import get_codec
+from pongy.codec import ICodec
+from pongy.codec import is_unchanged
+from pongy.server.metrics import SPECTATOR_FANOUT_DURATION
+from pongy.server.metrics import SPECTATORS
+from pongy.server.sender import FrameSender
+
+logger = logging.getLogger(__name__)
+
+
+class Spectators:
+    # Read-only viewers of one game, kept apart from its players. A fan-out
+    # encodes the state once per protocol, reusing the players' frames where
+    # they match, and hands it to every viewer's one frame deep queue, so a
+    # slow viewer only misses stale frames. Viewers get every few of the
+    # players' frames: the interval doubles while fanning out takes longer
+    # than the budget, and halves back while it takes under half of it.
+    __slots__ = (
+        "_viewers",
+        "_codecs",
+        "_fresh",
+        "_sent",
+        "_every",
+        "_min_every",
+        "_max_every",
+        "_budget",
+        "_skipped",
+    )
+
+    def __init__(
+        self,
+        every: int = settings.SPECTATOR_SNAPSHOT_EVERY,
+        max_every: int = settings.SPECTATOR_MAX_SNAPSHOT_EVERY,
+        budget: float = settings.SPECTATOR_FANOUT_BUDGET,
+    ) -> None:
+        self._viewers: dict[str, dict[FrameSender, web.WebSocketResponse]] = {}
+        self._codecs: dict[str, ICodec] = {}
+        self._fresh: set[FrameSender] = set()
+        self._sent: GameState | None = None
+        self._every = every
+        self._min_every = every
+        self._max_every = max_every
+        self._budget = budget
+        self._skipped = 0
+
+    def __len__(self) -> int:
+        return sum(len(viewers) for viewers in self._viewers.values())
+
+    @property
+    def every(self) -> int:
+        return self._every
+
+    def add(self, ws: web.WebSocketResponse) -> FrameSender:
+        codec = get_codec(ws.ws_protocol)
+        self._codecs.setdefault(codec.protocol, codec)
+        sender = FrameSender(ws, depth=1, max_lag=settings.SPECTATOR_MAX_LAG)
+        self._viewers.setdefault(codec.protocol, {})[sender] = ws
+        self._fresh.add(sender)
+        SPECTATORS.inc()
+        return sender
+
+    def remove(self, sender: FrameSender) -> None:
+        for viewers in self._viewers.values():
+            if viewers.pop(sender, None) is not None:
+                self._fresh.discard(sender)
+                sender.close()
+                SPECTATORS.dec()
+
+    def close(self) -> None:
+        for viewers in self._viewers.values():
+            for ws in viewers.values():
+                asyncio.create_task(
+                    ws.close(code=WSCloseCode.GOING_AWAY, message=b"Game over")
+                )
+
+    def broadcast(
+        self,
+        state: GameState,
+        frames: dict[tuple[str, int | None], str | bytes],
+        waiting: bool = False,
+    ) -> None:
+        self._skipped += 1
+        if self._skipped < self._every:
+            return
+        if waiting and not self._fresh and is_unchanged(self._sent, state):
+            return
+        self._skipped = 0
+        started = time.perf_counter()
+        for protocol, viewers in self._viewers.items():
+            codec = self._codecs[protocol]
+            base = codec.baseline(state, self._sent)
+            key = protocol, base.tick if base else None
+            if key not in frames:
+                frames[key] = codec.encode(state, base)
+            for sender in viewers:
+                if sender.is_full:
+                    # The dropped frame breaks the viewer's chain of deltas.
+                    sender.drop()
+                    self._fresh.add(sender)
+                if base is not None and sender in self._fresh:
+                    # Deltas are no use to a viewer who has no state yet.
+                    if (protocol, None) not in frames:
+                        frames[protocol, None] = codec.encode(state)
+                    sender.push(frames[protocol, None])
+                else:
+                    sender.push(frames[key])
+        self._fresh.clear()
+        self._sent = state
+        duration = time.perf_counter() - started
+        SPECTATOR_FANOUT_DURATION.observe(duration)
+        if duration > self._budget:
+            self._every = min(self._every * 2, self._max_every)
+        elif duration < self._budget / 2:
+            self._every = max(self._every // 2, self._min_every)
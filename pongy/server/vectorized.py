@@ -0,0 +1,267 @@
+from random import Random
+
+import numpy as np
+import numpy.typing as npt
+
+from pongy import settings
+from pongy.models import BoardSide
+from pongy.models import MoveDirection
+from pongy.server.collision import FAR_SIDES
+from pongy.server.collision import HIT_ANGLES
+from pongy.server.collision import HORIZONTAL_SIDES
+from pongy.server.collision import MAX_CONTACTS
+from pongy.server.collision import RACKET_LINES
+from pongy.server.collision import WALL_LINES
+from pongy.server.engine import IGame
+from pongy.server.racket import BaseRacket
+from pongy.server.racket import IRacket
+
+# Racket columns in the order players take them from Game.available_rackets,
+# which is also the order collision ties between sides are resolved in.
+COLUMNS = (BoardSide.BOTTOM, BoardSide.TOP, BoardSide.LEFT, BoardSide.RIGHT)
+
+# Held racket input as a step sign, so all rackets move in one operation.
+DIRECTIONS = {None: 0, MoveDirection.LEFT: -1, MoveDirection.RIGHT: 1}
+
+
+class NumpyEngine:
+    def __init__(self, capacity: int = 1024) -> None:
+        self._games: list[IGame | None] = [None] * capacity
+        self._slots: dict[IGame, int] = {}
+        self._free: list[int] = list(range(capacity - 1, -1, -1))
+        self.alive: npt.NDArray[np.bool_] = np.zeros(capacity, dtype=bool)
+        self.ball_x: npt.NDArray[np.float64] = np.zeros(capacity)
+        self.ball_y: npt.NDArray[np.float64] = np.zeros(capacity)
+        self.speed: npt.NDArray[np.float64] = np.zeros(capacity)
+        self.angle: npt.NDArray[np.float64] = np.zeros(capacity)
+        self.rackets: npt.NDArray[np.float64] = np.zeros((capacity, len(COLUMNS)))
+        self.active: npt.NDArray[np.bool_] = np.zeros(
+            (capacity, len(COLUMNS)), dtype=bool
+        )
+        self.direction: npt.NDArray[np.int8] = np.zeros(
+            (capacity, len(COLUMNS)), dtype=np.int8
+        )
+
+    def add(self, game: IGame) -> None:
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        self._games[slot] = game
+        self._slots[game] = slot
+        self.alive[slot] = True
+        self.ball_x[slot], self.ball_y[slot] = game.ball.position
+        self.speed[slot] = game.ball.speed
+        self.angle[slot] = game.ball.angle
+        game.ball = ArrayBall(self, slot, game.ball.rng)
+        rackets: list[IRacket] = []
+        for racket in game.available_rackets:
+            column = COLUMNS.index(racket.side)
+            self.rackets[slot, column] = racket.position
+            self.active[slot, column] = False
+            self.direction[slot, column] = DIRECTIONS[racket.direction]
+            rackets.append(ArrayRacket(self, slot, racket.side))
+        game.available_rackets[:] = rackets
+
+    def remove(self, game: IGame) -> None:
+        slot = self._slots.pop(game, None)
+        if slot is None:
+            return
+        self._games[slot] = None
+        self.alive[slot] = False
+        self.active[slot] = False
+        self.direction[slot] = 0
+        self.speed[slot] = 0
+        self._free.append(slot)
+
+    def step(self, dt: float) -> None:
+        # Balls of waiting games get no time to move.
+        for game, slot in self._slots.items():
+            game.tick += 1
+            self.alive[slot] = not game.waiting
+        # Free slots and free rackets have no speed and no held input, so
+        # stepping every row leaves them as is.
+        self.rackets += self.direction * (settings.RACKET_SPEED * dt)
+        np.clip(
+            self.rackets,
+            0,
+            settings.BOARD_SIZE - settings.RACKET_LENGTH,
+            out=self.rackets,
+        )
+        remaining = np.where(self.alive, dt, 0.0)
+        for _ in range(MAX_CONTACTS):
+            if not self._sweep(remaining):
+                break
+
+    def _sweep(self, remaining: npt.NDArray[np.float64]) -> bool:
+        # One pass of collision.advance for every ball at once. Balls with
+        # no contact within their remaining time move all the way, the rare
+        # ones with a contact are moved to it and bounced one by one, and
+        # need another pass for the rest of their time.
+        radians = np.radians(self.angle)
+        distance = self.speed * remaining
+        dx = distance * np.cos(radians)
+        dy = distance * np.sin(radians)
+        time = np.full(len(remaining), np.inf)
+        # Racket contacts as column * 2, wall contacts as column * 2 + 1.
+        contact = np.full(len(remaining), -1)
+        for column, side in enumerate(COLUMNS):
+            far = side in FAR_SIDES
+            if side in HORIZONTAL_SIDES:
+                start, delta, along, along_delta = self.ball_y, dy, self.ball_x, dx
+            else:
+                start, delta, along, along_delta = self.ball_x, dx, self.ball_y, dy
+            racket_time = self._crossing(start, delta, RACKET_LINES[side], far)
+            hit = along + along_delta * np.where(np.isinf(racket_time), 0, racket_time)
+            position = self.rackets[:, column]
+            racket = (
+                np.isfinite(racket_time)
+                & self.active[:, column]
+                & (position - settings.BALL_SIZE < hit)
+                & (hit < position + settings.RACKET_LENGTH + settings.BALL_SIZE)
+            )
+            wall_time = self._crossing(start, delta, WALL_LINES[side], far)
+            side_time = np.where(racket, racket_time, wall_time)
+            earlier = side_time < time
+            time[earlier] = side_time[earlier]
+            contact[earlier] = np.where(racket, column * 2, column * 2 + 1)[earlier]
+        free = np.isinf(time)
+        self.ball_x[free] += dx[free]
+        self.ball_y[free] += dy[free]
+        remaining[free] = 0
+        contacts = np.flatnonzero(~free)
+        for slot in contacts.tolist():
+            self._bounce(slot, contact[slot], time[slot], dx[slot], dy[slot])
+            remaining[slot] *= 1 - time[slot]
+        return bool(contacts.size)
+
+    @staticmethod
+    def _crossing(
+        start: npt.NDArray[np.float64],
+        delta: npt.NDArray[np.float64],
+        line: int,
+        far: bool,
+    ) -> npt.NDArray[np.float64]:
+        end = start + delta
+        if far:
+            crossed = (start <= line) & (line < end)
+        else:
+            crossed = (end < line) & (line <= start)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(crossed, (line - start) / delta, np.inf)
+
+    def _bounce(
+        self, slot: int, contact: int, time: float, dx: float, dy: float
+    ) -> None:
+        game = self._games[slot]
+        if game is None:
+            return
+        column, wall = divmod(int(contact), 2)
+        side = COLUMNS[column]
+        line = WALL_LINES[side] if wall else RACKET_LINES[side]
+        if side in HORIZONTAL_SIDES:
+            self.ball_x[slot] += dx * time
+            self.ball_y[slot] = line
+        else:
+            self.ball_x[slot] = line
+            self.ball_y[slot] += dy * time
+        if wall:
+            if side in HORIZONTAL_SIDES:
+                self.angle[slot] = -self.angle[slot]
+            else:
+                self.angle[slot] = 180 - self.angle[slot]
+            game.bounce_notify(side)
+        else:
+            start, stop = HIT_ANGLES[side]
+            self.angle[slot] = game.ball.rng.randint(start, stop)
+            self.speed[slot] = game.ball.rng.randint(
+                settings.MIN_BALL_SPPED, settings.MAX_BALL_SPEED
+            )
+
+    def _grow(self) -> None:
+        capacity = len(self._games)
+        self._games.extend([None] * capacity)
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+        self.alive = np.concatenate([self.alive, np.zeros(capacity, dtype=bool)])
+        self.ball_x = np.concatenate([self.ball_x, np.zeros(capacity)])
+        self.ball_y = np.concatenate([self.ball_y, np.zeros(capacity)])
+        self.speed = np.concatenate([self.speed, np.zeros(capacity)])
+        self.angle = np.concatenate([self.angle, np.zeros(capacity)])
+        self.rackets = np.concatenate([self.rackets, np.zeros_like(self.rackets)])
+        self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+        self.direction = np.concatenate([self.direction, np.zeros_like(self.direction)])
+
+
+class ArrayBall:
+    __slots__ = ("_engine", "_slot", "rng")
+
+    def __init__(self, engine: NumpyEngine, slot: int, rng: Random) -> None:
+        self._engine = engine
+        self._slot = slot
+        self.rng = rng
+
+    @property
+    def speed(self) -> int:
+        return int(self._engine.speed[self._slot])
+
+    @speed.setter
+    def speed(self, value: int) -> None:
+        self._engine.speed[self._slot] = value
+
+    @property
+    def angle(self) -> int:
+        return int(self._engine.angle[self._slot])
+
+    @angle.setter
+    def angle(self, value: int) -> None:
+        self._engine.angle[self._slot] = value
+
+    @property
+    def position(self) -> tuple[float, float]:
+        return float(self._engine.ball_x[self._slot]), float(
+            self._engine.ball_y[self._slot]
+        )
+
+    @position.setter
+    def position(self, value: tuple[float, float]) -> None:
+        self._engine.ball_x[self._slot], self._engine.ball_y[self._slot] = value
+
+    def change_speed(self) -> None:
+        self.speed = self.rng.randint(settings.MIN_BALL_SPPED, settings.MAX_BALL_SPEED)
+
+
+class ArrayRacket(BaseRacket):
+    # pylint: disable=super-init-not-called
+    __slots__ = ("_engine", "_slot", "_column")
+
+    def __init__(self, engine: NumpyEngine, slot: int, side: BoardSide) -> None:
+        self._engine = engine
+        self._slot = slot
+        self._column = COLUMNS.index(side)
+        self.side = side
+
+    @property
+    def position(self) -> float:
+        return float(self._engine.rackets[self._slot, self._column])
+
+    @position.setter
+    def position(self, value: float) -> None:
+        self._engine.rackets[self._slot, self._column] = value
+
+    @property
+    def active(self) -> bool:
+        return bool(self._engine.active[self._slot, self._column])
+
+    @active.setter
+    def active(self, value: bool) -> None:
+        self._engine.active[self._slot, self._column] = value
+
+    @property
+    def direction(self) -> MoveDirection | None:
+        sign = self._engine.direction[self._slot, self._column]
+        if sign == 0:
+            return None
+        return MoveDirection.LEFT if sign < 0 else MoveDirection.RIGHT
+
+    @direction.setter
+    def direction(self, value: MoveDirection | None) -> None:
+        self._engine.direction[self._slot, self._column] = DIRECTIONS[value]
@@ -0,0 +1,332 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import socket
+from contextlib import suppress
+from dataclasses import dataclass
+from dataclasses import field
+from http.cookies import CookieError
+from http.cookies import SimpleCookie
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+from aiohttp import web
+
+from pongy import settings
+from pongy.replay import wait_replays
+from pongy.server.app import get_application
+from pongy.server.game import GamePool
+
+logger = logging.getLogger(__name__)
+
+# Request heads are peeked for up to this many bytes and seconds, and the
+# connection goes to the target worker if the head isn't all there by then.
+HEAD_MAX_SIZE = 8192
+
+HEAD_TIMEOUT = 1
+
+HEAD_POLL_INTERVAL = 0.005
+
+STATUS_READ_SIZE = 65536
+
+SPECTATE_PATH = "/ws/spectate/"
+
+GAMES_PATH = "/games"
+
+
+@dataclass
+class Worker:
+    index: int
+    process: BaseProcess
+    sockets: socket.socket
+    status: socket.socket
+    awaiting: bool = False
+    alive: bool = True
+    buffer: bytes = field(default=b"", repr=False)
+
+
+def parse_head(head: bytes) -> tuple[str, str | None]:
+    # The path and player id cookie of a request head, as far as it goes.
+    lines = head.decode("latin-1").split("\r\n")
+    target = lines[0].split(" ")
+    path = target[1].partition("?")[0] if len(target) > 2 else ""
+    player_id = None
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() != "cookie":
+            continue
+        cookie = SimpleCookie()
+        with suppress(CookieError):
+            cookie.load(value)
+        if "player_id" in cookie:
+            player_id = cookie["player_id"].value
+    return path, player_id
+
+
+# Accepts connections on the shared listening socket and hands their file
+# descriptors to workers. New connections go to one target worker until it
+# reports that it has no game awaiting players, so games still fill up to four
+# players before the next worker starts a new one. Workers report the players
+# they seat or hold and their games as JSON lines on their status channel. A
+# connection whose cookie names one of those players goes to that worker, so
+# it can resume there, spectators go to the worker running their game, and the
+# game list is answered here for all workers.
+class Dispatcher:
+    def __init__(self, workers: list[Worker]) -> None:
+        self._workers = workers
+        self._target = 0
+        self._players: dict[str, Worker] = {}
+        self._games: dict[str, tuple[Worker, list[int]]] = {}
+        self._routing: set[asyncio.Task[None]] = set()
+
+    async def serve(self, listener: socket.socket) -> None:
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            loop.add_reader(worker.status.fileno(), self._on_status, worker)
+        while any(worker.alive for worker in self._workers):
+            connection, _ = await loop.sock_accept(listener)
+            task = asyncio.create_task(self._route(connection))
+            self._routing.add(task)
+            task.add_done_callback(self._routing.discard)
+
+    async def _route(self, connection: socket.socket) -> None:
+        with connection:
+            try:
+                head = await asyncio.wait_for(peek_head(connection), HEAD_TIMEOUT)
+            except (asyncio.TimeoutError, OSError):
+                head = b""
+            path, player_id = parse_head(head)
+            if path == GAMES_PATH:
+                await self._send_games(connection)
+                return
+            owner = None
+            if path.startswith(SPECTATE_PATH):
+                game = self._games.get(path.removeprefix(SPECTATE_PATH))
+                owner = game[0] if game else None
+            elif player_id:
+                owner = self._players.get(player_id)
+            if owner is None or not self._send(owner, connection):
+                self._dispatch(connection)
+
+    async def _send_games(self, connection: socket.socket) -> None:
+        # The same listing a worker's GamesHandler serves, for every worker.
+        connection.recv(HEAD_MAX_SIZE)
+        body = json.dumps(
+            [
+                {"id": game_id, "players": players, "spectators": spectators}
+                for game_id, (_, (players, spectators)) in self._games.items()
+            ]
+        ).encode()
+        await asyncio.get_running_loop().sock_sendall(
+            connection,
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/json; charset=utf-8\r\n"
+            b"Content-Length: %d\r\n"
+            b"Connection: close\r\n\r\n" % len(body) + body,
+        )
+
+    def _dispatch(self, connection: socket.socket) -> None:
+        for _ in range(len(self._workers)):
+            if self._send(self._workers[self._target], connection):
+                return
+            self._advance()
+        logger.error("No workers alive, dropping connection")
+
+    @staticmethod
+    def _send(worker: Worker, connection: socket.socket) -> bool:
+        if not worker.alive:
+            return False
+        try:
+            socket.send_fds(worker.sockets, [b"\0"], [connection.fileno()])
+        except OSError:
+            logger.error("Worker is unreachable", extra={"worker": worker.index})
+            worker.alive = False
+            return False
+        return True
+
+    def _on_status(self, worker: Worker) -> None:
+        data = worker.status.recv(STATUS_READ_SIZE)
+        if not data:
+            asyncio.get_running_loop().remove_reader(worker.status.fileno())
+            logger.error("Worker exited", extra={"worker": worker.index})
+            worker.alive = False
+            worker.awaiting = False
+            self._players = {
+                player_id: owner
+                for player_id, owner in self._players.items()
+                if owner is not worker
+            }
+            self._games = {
+                game_id: game
+                for game_id, game in self._games.items()
+                if game[0] is not worker
+            }
+        else:
+            *lines, worker.buffer = (worker.buffer + data).split(b"\n")
+            for line in lines:
+                self._on_report(worker, json.loads(line))
+        if worker.index == self._target and not worker.awaiting:
+            self._advance()
+
+    def _on_report(self, worker: Worker, report: dict[str, Any]) -> None:
+        worker.awaiting = report.get("awaiting", worker.awaiting)
+        for player_id in report.get("joined", ()):
+            self._players[player_id] = worker
+        for player_id in report.get("left", ()):
+            if self._players.get(player_id) is worker:
+                del self._players[player_id]
+        for game_id, counts in report.get("games", {}).items():
+            self._games[game_id] = worker, counts
+        for game_id in report.get("ended", ()):
+            self._games.pop(game_id, None)
+
+    def _advance(self) -> None:
+        self._target = (self._target + 1) % len(self._workers)
+
+
+async def peek_head(connection: socket.socket) -> bytes:
+    # The request head is left in the socket for the worker to read.
+    loop = asyncio.get_running_loop()
+    while True:
+        readable = loop.create_future()
+
+        def on_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(connection.fileno(), on_readable)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(connection.fileno())
+        head = connection.recv(HEAD_MAX_SIZE, socket.MSG_PEEK)
+        if not head or b"\r\n\r\n" in head or len(head) == HEAD_MAX_SIZE:
+            return head
+        await asyncio.sleep(HEAD_POLL_INTERVAL)
+
+
+async def _serve_worker(
+    sockets: socket.socket,
+    status: socket.socket,
+    engine: str,
+    replay_dir: str | None,
+    compression: str,
+) -> None:
+    runner = web.AppRunner(
+        get_application(engine, replay_dir=replay_dir, compression=compression)
+    )
+    await runner.setup()
+    server = runner.server
+    if server is None:
+        raise RuntimeError("Application runner is not set up")
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+
+    def on_socket() -> None:
+        try:
+            message, fds, _, _ = socket.recv_fds(sockets, 1, 1)
+        except BlockingIOError:
+            return
+        if not message:
+            loop.remove_reader(sockets.fileno())
+            stopped.set()
+            return
+        for fd in fds:
+            connection = socket.socket(fileno=fd)
+            connection.setblocking(False)
+            loop.create_task(loop.connect_accepted_socket(server, connection))
+
+    loop.add_reader(sockets.fileno(), on_socket)
+    reports: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    GamePool.reports = reports
+
+    async def send_reports() -> None:
+        while True:
+            report = await reports.get()
+            await loop.sock_sendall(status, json.dumps(report).encode() + b"\n")
+
+    sending = asyncio.create_task(send_reports())
+    await stopped.wait()
+    sending.cancel()
+    await runner.cleanup()
+
+
+def _run_worker(
+    sockets: socket.socket,
+    status: socket.socket,
+    engine: str,
+    replay_dir: str | None,
+    compression: str,
+    inherited: list[socket.socket],
+) -> None:
+    # The supervisor owns Ctrl+C and stops workers by closing their channel,
+    # which only reaches EOF once no forked copy of its end stays open.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for inherited_socket in inherited:
+        inherited_socket.close()
+    sockets.setblocking(False)
+    status.setblocking(False)
+    asyncio.run(_serve_worker(sockets, status, engine, replay_dir, compression))
+    # Forked processes exit without waiting for threads.
+    wait_replays()
+
+
+async def _supervise(dispatcher: Dispatcher, listener: socket.socket) -> None:
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(dispatcher.serve(listener))
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, task.cancel)
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+def run_workers(
+    host: str,
+    port: int,
+    count: int,
+    engine: str,
+    replay_dir: str | None = None,
+    compression: str = settings.WS_COMPRESSION,
+) -> None:
+    # File descriptor passing and fork are POSIX only.
+    context = multiprocessing.get_context("fork")
+    workers: list[Worker] = []
+    for index in range(count):
+        sockets, worker_sockets = socket.socketpair()
+        status, worker_status = socket.socketpair()
+        inherited = [sockets, status]
+        for worker in workers:
+            inherited.extend((worker.sockets, worker.status))
+        process = context.Process(
+            target=_run_worker,
+            args=(
+                worker_sockets,
+                worker_status,
+                engine,
+                replay_dir,
+                compression,
+                inherited,
+            ),
+            name=f"pongy-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        worker_sockets.close()
+        worker_status.close()
+        workers.append(Worker(index, process, sockets, status))
+    listener = socket.create_server((host, port), backlog=1024)
+    listener.setblocking(False)
+    logger.info("Serving", extra={"host": host, "port": port, "workers": count})
+    try:
+        asyncio.run(_supervise(Dispatcher(workers), listener))
+    finally:
+        listener.close()
+        for worker in workers:
+            worker.sockets.close()
+            worker.status.close()
+        for worker in workers:
+            worker.process.join(timeout=settings.WS_HEARTBEAT_TIMEOUT)
+            if worker.process.is_alive():
+                worker.process.terminate()
@@ -21,20 +21,110 @@ SCORE_FONT_SIZE = 40
 
 SCORE_TEXT_SHIFT = 100
 
-RACKET_SPEED = 10
+# Racket and ball speeds are in pixels per second.
+RACKET_SPEED = 600
 
-DEFAULT_BALL_SPEED = 3
+DEFAULT_BALL_SPEED = 180
 
-MIN_BALL_SPPED = 7
+MIN_BALL_SPPED = 420
 
-MAX_BALL_SPEED = 12
+MAX_BALL_SPEED = 720
 
+# WebSocket permessage-deflate for state frames: "off", "message" to deflate
+# every frame on its own, or "context" to keep the deflate context across a
+# connection's frames, which compresses far better but holds about 256 KiB
+# per connection. See --bench-compression for the tradeoff.
+WS_COMPRESSION = "off"
+
+# Seconds between pings on both ends, a connection that misses a pong for
+# half of that is closed.
 WS_HEARTBEAT_TIMEOUT = 10
 
-FPS = 60
+# Players who send nothing for this many seconds are disconnected.
+WS_IDLE_TIMEOUT = 300
+
+# Seconds between sweeps for dead connections, idle players and orphaned games.
+REAPER_INTERVAL = 5
+
+WS_SEND_QUEUE_DEPTH = 3
+
+WS_SEND_MAX_LAG = 5
+
+# Bigger commands are dropped unparsed.
+WS_COMMAND_MAX_SIZE = 256
+
+# Commands per second allowed per player, and the burst on top of it.
+WS_COMMAND_RATE = 60
+
+WS_COMMAND_BURST = 30
+
+# Physics steps per second, stepped with a fixed timestep. Collisions are
+# swept along the ball's path, so fast balls don't need a high rate.
+TICK_RATE = 60
+
+# State frames sent per second, TICK_RATE should be a multiple of it.
+SNAPSHOT_RATE = 30
+
+# Spectators get every few of the players' state frames, fewer while handing
+# a frame to a game's viewers takes longer than the budget in seconds.
+SPECTATOR_SNAPSHOT_EVERY = 3
+
+SPECTATOR_MAX_SNAPSHOT_EVERY = 30
+
+SPECTATOR_FANOUT_BUDGET = 0.005
+
+# Seconds a spectator may stay behind before being disconnected.
+SPECTATOR_MAX_LAG = 10
+
+# Games with fewer players wait for more with the ball held still, and only
+# send state when it changes.
+GAME_MIN_PLAYERS = 2
+
+CLIENT_FPS = 60
+
+# Repaint only changed areas instead of the whole board every frame.
+DIRTY_RECT_RENDERING = True
+
+# Should cover about two snapshot intervals.
+INTERPOLATION_DELAY = 0.1
+
+# Seconds of racket movement the local prediction may run ahead of the server.
+PREDICTION_MAX_LAG = 0.25
+
+# Input changes sent per second at most.
+INPUT_MAX_RATE = 30
+
+# In ticks.
+KEYFRAME_INTERVAL = 60
+
+# "scalar" or "numpy", the latter requires the optional numpy dependency.
+PHYSICS_ENGINE = "scalar"
 
 LOGGING_LEVEL = logging.DEBUG
 
 SERVER_HOST = "0.0.0.0"
 
 SERVER_PORT = 8888
+
+SERVER_WORKERS = 1
+
+MATCHMAKING_RESERVATION_TIMEOUT = 10
+
+# Seconds a dropped player's slot and score are held for them to reconnect.
+SESSION_RESUME_TIMEOUT = 10
+
+# The client reconnects after a dropped connection, waiting twice as long
+# after each failed attempt.
+RECONNECT_ATTEMPTS = 6
+
+RECONNECT_DELAY = 0.5
+
+RECONNECT_MAX_DELAY = 4
+
+# Directory to record game replays to, off when not set.
+REPLAY_DIR: str | None = None
+
+REPLAY_BUFFER_SIZE = 64 * 1024
+
+# In ticks, how often playback can start from.
+REPLAY_INDEX_INTERVAL = 60
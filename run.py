@@ -4,6 +4,7 @@ import click
 from pythonjsonlogger import jsonlogger
 
 from pongy import settings
+from pongy.compression import MODES
 
 
 @click.command(context_settings=dict(help_option_names=["-h", "--help"]))
@@ -22,22 +23,185 @@ from pongy import settings
     type=click.INT,
     default=settings.SERVER_PORT,
 )
-def main(daemon: bool, host: str, port: int) -> None:
+@click.option(
+    "-e",
+    "--engine",
+    help="Server physics engine, numpy requires the numpy extra.",
+    type=click.Choice(["scalar", "numpy"]),
+    default=settings.PHYSICS_ENGINE,
+)
+@click.option(
+    "-w",
+    "--workers",
+    help="Server worker processes.",
+    type=click.IntRange(min=1),
+    default=settings.SERVER_WORKERS,
+)
+@click.option(
+    "-b",
+    "--broker",
+    help="Matchmaking broker address shared by server nodes, host:port or socket path.",
+    type=click.STRING,
+)
+@click.option(
+    "-n",
+    "--node",
+    help="Address clients reach this server node at, defaults to host:port.",
+    type=click.STRING,
+)
+@click.option(
+    "--replay-dir",
+    help="Directory to record game replays to.",
+    type=click.Path(exists=True, file_okay=False, writable=True),
+    default=settings.REPLAY_DIR,
+)
+@click.option(
+    "--replay",
+    help="Replay file to print states and inputs of, as JSON lines.",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--from-tick",
+    help="Replay tick to start printing at.",
+    type=click.IntRange(min=0),
+    default=0,
+)
+@click.option(
+    "--to-tick",
+    help="Replay tick to stop printing after.",
+    type=click.IntRange(min=0),
+)
+@click.option("--serve-broker", is_flag=True, help="Run matchmaking broker.")
+@click.option(
+    "--simulate", is_flag=True, help="Step games headless as fast as possible."
+)
+@click.option(
+    "--games",
+    help="Simulated games.",
+    type=click.IntRange(min=1),
+    default=1,
+)
+@click.option(
+    "--ticks",
+    help="Simulated ticks.",
+    type=click.IntRange(min=1),
+    default=100000,
+)
+@click.option(
+    "--seed",
+    help="Seed of the first simulated game, the next ones count up from it.",
+    type=click.INT,
+)
+@click.option("--spectate", help="Game id to watch instead of playing.")
+@click.option("--bench", is_flag=True, help="Run headless load generator.")
+@click.option(
+    "--players",
+    help="Benchmark players.",
+    type=click.IntRange(min=1),
+    default=100,
+)
+@click.option(
+    "--rate",
+    help="Benchmark move commands per second per player.",
+    type=click.FloatRange(min=0, min_open=True),
+    default=10.0,
+)
+@click.option(
+    "--duration",
+    help="Benchmark duration in seconds.",
+    type=click.FloatRange(min=0, min_open=True),
+    default=30.0,
+)
+@click.option(
+    "--compression",
+    help="WebSocket compression, offered by clients and accepted by servers.",
+    type=click.Choice(MODES),
+    default=settings.WS_COMPRESSION,
+)
+@click.option(
+    "--bench-compression",
+    is_flag=True,
+    help="Report bytes and CPU per frame of each compression mode on simulated "
+    "ticks.",
+)
+def main(  # pylint: disable=too-many-arguments,too-many-locals
+    daemon: bool,
+    host: str,
+    port: int,
+    engine: str,
+    workers: int,
+    broker: str | None,
+    node: str | None,
+    replay_dir: str | None,
+    replay: str | None,
+    from_tick: int,
+    to_tick: int | None,
+    serve_broker: bool,
+    simulate: bool,
+    games: int,
+    ticks: int,
+    seed: int | None,
+    spectate: str | None,
+    bench: bool,
+    players: int,
+    rate: float,
+    duration: float,
+    compression: str,
+    bench_compression: bool,
+) -> None:
+    if workers > 1 and broker:
+        raise click.UsageError("Workers can't be combined with a broker.")
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(jsonlogger.JsonFormatter(timestamp=True))
     logging.basicConfig(level=settings.LOGGING_LEVEL, handlers=[stream_handler])
-    if daemon:
+    if replay:
+        from pongy.replay import print_replay
+
+        print_replay(replay, from_tick, to_tick)
+    elif simulate:
+        from pongy.server.simulation import run_simulation
+
+        run_simulation(engine, games, ticks, seed)
+    elif bench_compression:
+        from pongy.compression import run_compression_bench
+
+        run_compression_bench(ticks, seed, engine)
+    elif bench:
+        import asyncio
+
+        from pongy.client.bench import run_bench
+
+        asyncio.run(
+            run_bench(host, port, players, rate, duration, compression=compression)
+        )
+    elif serve_broker:
+        import asyncio
+
+        from pongy.server.matchmaking import BrokerServer
+
+        asyncio.run(BrokerServer().serve(broker or f"{host}:{port}"))
+    elif daemon and workers > 1:
+        from pongy.server.workers import run_workers
+
+        run_workers(host, port, workers, engine, replay_dir, compression)
+    elif daemon:
         from aiohttp import web
 
         from pongy.server.app import get_application
 
-        web.run_app(get_application(), host=host, port=port)
+        web.run_app(
+            get_application(
+                engine, broker, node or f"{host}:{port}", replay_dir, compression
+            ),
+            host=host,
+            port=port,
+        )
     else:
         import asyncio
 
         from pongy.client.app import Application
 
-        app = Application(host, port)
+        app = Application(host, port, spectate, compression)
         asyncio.run(app())
 
 